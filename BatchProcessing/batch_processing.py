@@ -0,0 +1,357 @@
+'''
+This module is used to convert the files of a folder in parallel
+Each file is converted in a worker process with its own conversion context,
+and the results are given back in the order of the files in the folder
+The files of the subfolders are converted into the same subfolders of the output folder
+'''
+import fnmatch
+import os
+import signal
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from BatchProcessing import manifest, memory
+from DataExtraction import data_extraction
+from JSONCreation import database, json_creation
+from Logger import logging
+from Tracing import tracing
+
+# Result of a file conversion, with the size of the file in bytes,
+# the number of pages found, the time taken in seconds,
+# the manifest entry of the file when it was converted incrementally,
+# the rows of the database tables when the file is exported to the database,
+# and the peak memory used by the conversion in bytes, when it is known
+FileResult = namedtuple("FileResult", ["file", "status", "remarks", "color", "if_inc",
+                                       "size", "pages", "seconds", "entry", "records",
+                                       "memory"],
+                        defaults=[None, None, None])
+
+# Conversion task of a file, with the manifest entry and the configuration hash
+# of incremental conversions, the trace format and profile mode when they are used,
+# the layout of the table data, whether the rows of the database tables are collected,
+# and the style level, "ALL" to give the style of each section along with the style table
+ConversionTask = namedtuple("ConversionTask", ["file", "file_no", "selected_folder",
+                                               "output_directory", "output_format", "entry",
+                                               "config", "trace", "profile", "table_layout",
+                                               "export", "style_level"],
+                            defaults=[None, None, None, None, "rows", False, "None"])
+
+# Extensions of the trace and profile files written beside the output
+TRACE_EXTENSIONS = {"json": ".trace.json", "chrome": ".chrome-trace.json"}
+PROFILE_EXTENSIONS = {"cprofile": ".prof", "tracemalloc": ".tracemalloc.txt"}
+
+# Seconds between two checks of the cancel event while waiting for a result
+CANCEL_CHECK_INTERVAL = 0.1
+
+# Number of files given to each worker process at a time, the others wait to be admitted
+TASKS_PER_WORKER = 2
+
+def worker_count(workers):
+    '''
+    Function to get the number of worker processes
+    A count of 0 or less uses one worker process for each CPU
+    '''
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def start_worker(records):
+    '''
+    Function to start a long running worker process, of the watcher or the service
+    Interrupts are left to the main process, which lets the files being converted finish,
+    and the configuration is read and the patterns compiled before the first file comes in
+    '''
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.use_worker_queue(records)
+    data_extraction.debug_print("Conversion worker started")
+    data_extraction.config_section("RTF TAGS")
+
+def matches(file, patterns):
+    '''
+    Function to check if the name or relative path of a file matches any of the globs
+    '''
+    path = file.replace(os.sep, "/")
+    name = os.path.basename(file)
+    return any(fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern)
+               for pattern in patterns)
+
+def scan_files(selected_folder, include=("*.rtf",), exclude=(), recursive=True, skip=()):
+    '''
+    Function to find the files of the selected folder, and of its subfolders when recursive
+    A file is kept when it matches an include glob and no exclude glob,
+    and a subfolder that matches an exclude glob is not scanned
+    The folders to skip, such as the output folder, are not scanned either
+    The paths are relative to the selected folder, with the largest file first,
+    so that the largest files are started first and the worker processes finish together
+    '''
+    skip = {os.path.abspath(folder) for folder in skip}
+    found = []
+    folders = [""]
+    while folders:
+        folder = folders.pop()
+        with os.scandir(os.path.join(selected_folder, folder)) as entries:
+            for entry in entries:
+                file = os.path.join(folder, entry.name)
+                if matches(file, exclude):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and os.path.abspath(entry.path) not in skip:
+                            folders.append(file)
+                    elif entry.is_file() and matches(file, include):
+                        found.append((entry.stat().st_size, file))
+                # The file was removed while the folder was scanned
+                except FileNotFoundError:
+                    continue
+    found.sort(key=lambda size_and_file: (-size_and_file[0], size_and_file[1]))
+    return [file for _, file in found]
+
+def file_output_directory(file, output_directory):
+    '''
+    Function to get the folder of the output of a file
+    The output folder mirrors the subfolders of the selected folder
+    '''
+    folder = os.path.dirname(file)
+    return os.path.join(output_directory, folder) if folder else output_directory
+
+def create_tasks(files, selected_folder, output_directory, output_format="json",
+                 file_manifest=None, config=None, trace=None, profile=None,
+                 table_layout="rows", export=False, style_level="None"):
+    '''
+    Function to create the conversion task of each file
+    The files are numbered in the same way as when they are converted one by one,
+    only the RTF files are counted
+    For incremental conversions, the manifest entry of each file is added to its task
+    '''
+    tasks = []
+    file_no = 0
+    for file in files:
+        entry = file_manifest.get(file) if file_manifest is not None else None
+        tasks.append(ConversionTask(file, file_no, selected_folder, output_directory,
+                                    output_format, entry, config, trace, profile,
+                                    table_layout, export, style_level))
+        if file.endswith('.rtf') and os.path.isfile(os.path.join(selected_folder, file)):
+            file_no += 1
+    return tasks
+
+def convert_file(task):
+    '''
+    Function to convert a single file, used by the worker processes
+    A new conversion context is created for the file
+    For incremental conversions, a file that is unchanged since it was last converted
+    is skipped, and a converted file is given the manifest entry to record
+    When a trace format is given, the trace of the file is written beside its output,
+    and when a profile mode is given, so is its profile
+    When the file is exported to the database, the rows of the database tables
+    are collected from its pages as they are written, and given with the result
+    The peak memory used by the conversion is measured and given with the result
+    '''
+    (file, file_no, selected_folder, output_directory, output_format, entry, config,
+     trace, profile, table_layout, export, style_level) = task
+    start = time.perf_counter()
+    file_path = os.path.join(selected_folder, file)
+    incremental = config is not None and file.endswith('.rtf') and os.path.isfile(file_path)
+    if incremental and manifest.is_unchanged(file_path, entry, config, output_directory):
+        data_extraction.debug_print(f"RTF File {file} is unchanged, skipped")
+        entry = manifest.create_entry(file, file_path, config, entry["output"], entry["pages"],
+                                      entry["hash"], entry.get("memory"))
+        return FileResult(file, "Successful", manifest.SKIPPED_REMARKS, 'green', True,
+                          entry["size"], entry["pages"], time.perf_counter() - start, entry)
+
+    # The content is hashed before the conversion, along with its size and modification time,
+    # so that a file changed while it is converted is converted again in the next run
+    stat = os.stat(file_path) if incremental else None
+    content_hash = manifest.file_hash(file_path) if incremental else None
+    baseline = memory.start_measure()
+    tracer = tracing.Tracer(file) if trace else None
+    context = data_extraction.ConversionContext(style_level, tracer, table_layout)
+    json_conversion = json_creation.OUTPUT_FORMATS[output_format]
+    records = None
+    if export:
+        records = database.create_records()
+        json_conversion = database.recording_conversion(json_conversion, records)
+    file_directory = file_output_directory(file, output_directory)
+    if file_directory != output_directory:
+        os.makedirs(file_directory, exist_ok=True)
+    arguments = (file, file_no, selected_folder, file_directory, json_conversion, context)
+    if profile:
+        profile_path = json_creation.output_path(file, file_directory,
+                                                 PROFILE_EXTENSIONS[profile])
+        status, remarks, color, if_inc = tracing.profile_call(
+            profile_path, profile, data_extraction.process_file, *arguments)
+    else:
+        status, remarks, color, if_inc = data_extraction.process_file(*arguments)
+    used_memory = memory.used_memory(baseline) if if_inc else None
+    if tracer is not None and if_inc:
+        tracer.write(json_creation.output_path(file, file_directory, TRACE_EXTENSIONS[trace]),
+                     trace)
+    size = os.path.getsize(file_path) if if_inc else 0
+    entry = None
+    # A file changed while it was converted is not recorded, so it is converted again
+    if incremental and status == "Successful" and manifest.is_same_file(stat, file_path):
+        extension = json_creation.OUTPUT_EXTENSIONS[output_format]
+        output = os.path.relpath(json_creation.output_path(file, file_directory, extension),
+                                 output_directory)
+        entry = manifest.create_entry(file, file_path, config, output, context.numpages,
+                                      content_hash, used_memory, stat)
+    if status != "Successful":
+        records = None
+    seconds = time.perf_counter() - start
+    logging.log_record(None, status, file=file, stage="convert_file", duration=seconds,
+                       error=remarks if status != "Successful" else None)
+    return FileResult(file, status, remarks, color, if_inc, size, context.numpages,
+                      seconds, entry, records, used_memory)
+
+def export_result(file_database, result):
+    '''
+    Function to write the tables of a converted file to the database
+    A file that cannot be written is logged and left out of the manifest,
+    so it is converted and written again in the next run, and the batch carries on
+    '''
+    try:
+        file_database.write(result.file, result.pages, result.records)
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        data_extraction.debug_print(f"Tables of {result.file} cannot be exported: {e}")
+        logging.write_exceptions(f"Tables of {result.file} cannot be written to the database "
+                                 f"due to {e}\n", file=result.file, stage="export_database",
+                                 error=str(e))
+        return result._replace(records=None, entry=None,
+                               remarks="Not written to the database")
+    return result._replace(records=None)
+
+def convert_files(files, selected_folder, output_directory, workers=1, output_format="json",
+                  cancel_event=None, incremental=False, force=False, trace=None, profile=None,
+                  table_layout="rows", database_file=None, memory_budget=None,
+                  style_level="None"):
+    '''
+    Function to convert the files of the selected folder
+    The files are fanned out across the worker processes, and the results
+    are yielded in the order of the files, whatever order the workers finish in
+    With a single worker the files are converted in the current process
+    Once the cancel event is set, no further results are yielded and
+    the files that have not been started are not converted
+    For incremental conversions, the files that are unchanged since the last run
+    are skipped, using the manifest kept in the output folder
+    When force is set, all the files are converted and recorded in the manifest
+    The trace format and profile mode are used to trace and profile each file,
+    and imply force, as the unchanged files would otherwise get no trace or profile
+    The table layout gives the table data by rows, or by columns, and with the style
+    level "ALL" the style of each section is given, along with the style table of the file
+    When a database file is given, the tables of the converted files are also written
+    to that SQLite database in the output folder, by this process alone,
+    with one transaction for each file
+    The worker processes are only given files while the memory the files being
+    converted are estimated to need stays within the memory budget, in bytes
+    The log files hold every record of the batch once the last result is given
+    '''
+    # The output folder is created before any file is given to the worker processes,
+    # as the files of the selected folder are written straight into it
+    os.makedirs(output_directory, exist_ok=True)
+    file_manifest = None
+    config = None
+    export = database_file is not None
+    force = force or trace is not None or profile is not None
+    if incremental:
+        file_manifest = manifest.Manifest(output_directory).load()
+        config = manifest.config_hash(output_format, table_layout, database_file, style_level)
+    tasks = create_tasks(files, selected_folder, output_directory, output_format,
+                         None if force else file_manifest, config, trace, profile,
+                         table_layout, export, style_level)
+    workers = min(worker_count(workers), len(tasks))
+    # The memory each file needs is estimated from the memory measured in earlier runs
+    estimator = memory.MemoryEstimator.from_entries(
+        file_manifest.entries.values() if file_manifest is not None else ())
+    file_database = database.Database(os.path.join(output_directory, database_file)) \
+        if export else None
+    try:
+        for result in convert_tasks(tasks, workers, cancel_event, memory_budget, estimator):
+            if result.records is not None:
+                result = export_result(file_database, result)
+            if result.entry is not None:
+                file_manifest.record(result.entry)
+            yield result
+    finally:
+        if file_manifest is not None:
+            file_manifest.close()
+        if file_database is not None:
+            file_database.close()
+        logging.flush_logs()
+
+def task_size(task):
+    '''
+    Function to get the size of the file of a conversion task, in bytes
+    '''
+    try:
+        return os.path.getsize(os.path.join(task.selected_folder, task.file))
+    except OSError:
+        return 0
+
+def submit_tasks(executor, tasks, futures, running, workers, memory_budget, estimator):
+    '''
+    Function to give the next tasks to the worker processes, in the order of the files,
+    while the estimated memory of the files being converted stays within the budget
+    A file estimated to need more than the whole budget is only given once
+    no other file is being converted, so it is converted alone
+    The estimated memory of each running task is kept by its future
+    '''
+    while len(futures) < len(tasks) and len(running) < workers * TASKS_PER_WORKER:
+        task = tasks[len(futures)]
+        needed = estimator.estimate(task_size(task))
+        if memory_budget is not None and running and \
+                sum(running.values()) + needed > memory_budget:
+            return
+        future = executor.submit(convert_file, task)
+        futures.append(future)
+        running[future] = needed
+
+def release_tasks(running, estimator):
+    '''
+    Function to release the memory of the tasks that have finished,
+    and to measure the memory factor from their results
+    '''
+    for future in [future for future in running if future.done()]:
+        del running[future]
+        if not future.cancelled() and future.exception() is None:
+            result = future.result()
+            estimator.record(result.size, result.memory)
+
+def convert_tasks(tasks, workers, cancel_event=None, memory_budget=None, estimator=None):
+    '''
+    Function to run the conversion tasks, in the current process for a single worker
+    and in a pool of worker processes otherwise
+    The pool is only given tasks while their estimated memory stays within the budget,
+    and the results are still given in the order of the tasks
+    '''
+    if workers <= 1:
+        for task in tasks:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            yield convert_file(task)
+        return
+
+    # The worker processes send their log records to the writer of this process
+    records = logging.start_worker_logging()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=logging.use_worker_queue,
+                                   initargs=(records,))
+    if estimator is None:
+        estimator = memory.MemoryEstimator()
+    futures = []
+    running = {}
+    try:
+        for index in range(len(tasks)):
+            while True:
+                release_tasks(running, estimator)
+                submit_tasks(executor, tasks, futures, running, workers, memory_budget,
+                             estimator)
+                if futures[index].done():
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                wait(running, timeout=CANCEL_CHECK_INTERVAL if cancel_event else None,
+                     return_when=FIRST_COMPLETED)
+            yield futures[index].result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        logging.stop_worker_logging(records)
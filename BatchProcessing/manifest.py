@@ -0,0 +1,165 @@
+'''
+This module is used to keep the manifest of the converted files
+The manifest is stored in the output folder with one line for each converted file,
+recording the size, modification time and content hash of the RTF file,
+along with the hash of the configuration and the version of the converter
+Files that have not changed since they were converted are skipped
+Each file is added to the manifest as soon as it is converted, so an interrupted
+batch carries on with the files that were not converted yet
+'''
+import hashlib
+import json
+import os
+
+from Configuration import configuration
+
+MANIFEST_FILE = "manifest.jsonl"
+
+# Version of the converter, to be raised whenever the output of a file can change,
+# so that the files converted by an earlier version are converted again
+CONVERTER_VERSION = "3.3.0"
+
+# Remarks given to the files that are skipped as they have not changed
+SKIPPED_REMARKS = "Unchanged, skipped"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def file_hash(file_path):
+    '''
+    Function to get the SHA-256 hash of the content of a file
+    '''
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def config_hash(output_format="json", table_layout="rows", database_file=None,
+                style_level="None"):
+    '''
+    Function to get the hash of the settings the files are converted with
+    It covers the configuration file, the version of the converter,
+    the output format, the layout of the table data and the style level
+    The database the tables are exported to changes the hash, so the files converted
+    without it, or for another database, are converted again and added to the database
+    '''
+    digest = hashlib.sha256()
+    with open(configuration.get_config_path(), 'rb') as file:
+        digest.update(file.read())
+    digest.update(f"\0{CONVERTER_VERSION}\0{output_format}\0{table_layout}".encode("utf-8"))
+    if database_file is not None:
+        digest.update(f"\0database\0{database_file}".encode("utf-8"))
+    if style_level == "ALL":
+        digest.update(b"\0styles")
+    return digest.hexdigest()
+
+def create_entry(file, file_path, config, output, pages, content_hash=None, memory=None,
+                 stat=None):
+    '''
+    Function to create the manifest entry of a converted file
+    The peak memory used to convert the file is kept to estimate the memory of later runs
+    The size and modification time should be taken along with the content hash,
+    before the file is converted, so that they describe the same content
+    '''
+    if stat is None:
+        stat = os.stat(file_path)
+    return {
+        "file": file,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": content_hash or file_hash(file_path),
+        "config": config,
+        "version": CONVERTER_VERSION,
+        "output": output,
+        "pages": pages,
+        "memory": memory,
+    }
+
+def is_same_file(stat, file_path):
+    '''
+    Function to check if a file still has the size and modification time of a stat
+    '''
+    try:
+        current = os.stat(file_path)
+    except OSError:
+        return False
+    return current.st_size == stat.st_size and current.st_mtime_ns == stat.st_mtime_ns
+
+def is_unchanged(file_path, entry, config, output_directory):
+    '''
+    Function to check if a file is unchanged since it was added to the manifest
+    The content is only hashed when the size matches but the modification time does not
+    The output of the file must still be in the output folder
+    '''
+    if entry is None or entry.get("config") != config:
+        return False
+    if entry.get("version") != CONVERTER_VERSION:
+        return False
+    if not os.path.isfile(os.path.join(output_directory, entry["output"])):
+        return False
+    stat = os.stat(file_path)
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns == entry["mtime"]:
+        return True
+    return file_hash(file_path) == entry["hash"]
+
+class Manifest:
+    '''
+    Class for the manifest of an output folder
+    New entries are appended to the manifest file, and later entries of a file
+    replace the earlier ones when the manifest is read
+    '''
+    def __init__(self, output_directory):
+        self.path = os.path.join(output_directory, MANIFEST_FILE)
+        self.entries = {}
+        self.journal = None
+
+    def load(self):
+        '''
+        Function to read the entries of the manifest file
+        A line left incomplete by an interrupted batch is ignored
+        '''
+        if not os.path.isfile(self.path):
+            return self
+        with open(self.path, 'r', encoding="utf-8") as manifest_file:
+            for line in manifest_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "file" in entry:
+                    self.entries[entry["file"]] = entry
+        return self
+
+    def get(self, file):
+        '''
+        Function to get the entry of a file, or None if it has not been converted
+        '''
+        return self.entries.get(file)
+
+    def record(self, entry):
+        '''
+        Function to add the entry of a converted file to the manifest file
+        The entry is written straight away so that it is kept if the batch is interrupted
+        '''
+        if self.journal is None:
+            self.journal = open(self.path, 'a', encoding="utf-8")
+        self.entries[entry["file"]] = entry
+        self.journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.journal.flush()
+
+    def close(self):
+        '''
+        Function to close the manifest file
+        The manifest file is rewritten with a single entry for each file
+        '''
+        if self.journal is None:
+            return
+        self.journal.close()
+        self.journal = None
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w', encoding="utf-8") as manifest_file:
+            for entry in self.entries.values():
+                manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temporary_path, self.path)
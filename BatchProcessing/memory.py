@@ -0,0 +1,138 @@
+'''
+This module is used to keep the memory used by a batch conversion within a budget
+The memory a file needs is estimated from its size and a factor, which is measured
+from the peak resident memory of the files converted before, so it calibrates itself
+The peak memory of each file is kept in the manifest, so the factor carries over to
+the next run
+The peak resident memory is read from /proc on Linux, where it is reset before
+each file, and from getrusage elsewhere, where only its growth can be seen
+'''
+import os
+import sys
+
+try:
+    import resource
+# The resource module is not available on Windows, where the memory is not measured
+except ImportError:
+    resource = None
+
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+# Memory needed by a file for each byte of its size, until the factor is measured
+DEFAULT_FACTOR = 2.0
+
+# Files smaller than this do not measure the factor, as their memory is mostly
+# the fixed cost of a conversion
+CALIBRATION_SIZE = 1024 * 1024
+
+# Share of the physical memory used as the budget when none is configured
+BUDGET_SHARE = 0.5
+
+def status_memory(field):
+    '''
+    Function to read a memory field of the process, in bytes, from /proc
+    Returns None when it cannot be read
+    '''
+    try:
+        with open(PROC_STATUS, 'r', encoding="ascii") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+def peak_memory():
+    '''
+    Function to get the peak resident memory of the process, in bytes
+    Returns None when it cannot be measured
+    '''
+    peak = status_memory("VmHWM")
+    if peak is None and resource is not None:
+        # The peak is given in bytes on macOS and in kilobytes elsewhere
+        unit = 1 if sys.platform == "darwin" else 1024
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    return peak
+
+def start_measure():
+    '''
+    Function to start measuring the peak memory of a conversion
+    The peak resident memory of the process is reset where it can be,
+    and the memory the peak of the conversion is measured from is returned
+    '''
+    try:
+        with open(PROC_CLEAR_REFS, 'w', encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return peak_memory()
+    current = status_memory("VmRSS")
+    return current if current is not None else peak_memory()
+
+def used_memory(baseline):
+    '''
+    Function to get the peak memory used by a conversion since it started to be measured
+    Returns None when it cannot be measured
+    '''
+    peak = peak_memory()
+    if peak is None or baseline is None:
+        return None
+    return max(peak - baseline, 0)
+
+def physical_memory():
+    '''
+    Function to get the physical memory of the machine, in bytes
+    Returns None when it is not known
+    '''
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def memory_budget(megabytes=0):
+    '''
+    Function to get the memory budget of a batch conversion, in bytes
+    A budget of 0 uses a share of the physical memory, and there is no budget
+    when the physical memory is not known
+    '''
+    if megabytes > 0:
+        return int(megabytes * 1024 * 1024)
+    physical = physical_memory()
+    if physical is None:
+        return None
+    return int(physical * BUDGET_SHARE)
+
+class MemoryEstimator:
+    '''
+    Class to estimate the memory a file needs to be converted
+    The factor is the largest measured ratio of the peak memory of a file to its size,
+    so the estimate errs on the side of too much memory
+    '''
+    def __init__(self, factor=None):
+        self.factor = factor
+
+    @classmethod
+    def from_entries(cls, entries):
+        '''
+        Function to create an estimator measured from the peak memory of manifest entries
+        '''
+        estimator = cls()
+        for entry in entries:
+            estimator.record(entry.get("size", 0), entry.get("memory"))
+        return estimator
+
+    def estimate(self, size):
+        '''
+        Function to estimate the memory needed to convert a file of the given size
+        '''
+        return int(size * (self.factor if self.factor is not None else DEFAULT_FACTOR))
+
+    def record(self, size, memory):
+        '''
+        Function to measure the factor from the peak memory of a converted file
+        '''
+        if memory is None or size < CALIBRATION_SIZE:
+            return
+        ratio = memory / size
+        if self.factor is None or ratio > self.factor:
+            self.factor = ratio
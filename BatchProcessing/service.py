@@ -0,0 +1,312 @@
+'''
+This module is used to run the RTF to JSON conversion as a long running local service
+The service answers JSON-RPC 2.0 requests sent by HTTP POST, and converts the RTF files
+in a pool of worker processes that are started once and kept warm, so a request does not
+pay for starting Python, reading the configuration or compiling the patterns
+A file is given by its path, or by its content encoded in base64, and the result of
+the "convert" method is the same JSON as the one written to the output file
+Requests wait in a queue of bounded size, and a request that finds the queue full is
+answered straight away with a busy error, so the callers can retry later
+'''
+import base64
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from BatchProcessing import batch_processing
+from Configuration import configuration
+from DataExtraction import data_extraction
+from JSONCreation import json_creation
+from Logger import logging
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Number of requests waiting for a worker process, beyond those being converted
+QUEUE_SIZE = 16
+
+# Largest request accepted, in bytes
+MAX_REQUEST_SIZE = 256 * 1024 * 1024
+
+# Seconds the callers are asked to wait before retrying when the service is busy
+RETRY_AFTER = 1
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+CONVERSION_ERROR = -32000
+BUSY_ERROR = -32001
+
+class RequestError(Exception):
+    '''
+    Error answered to a JSON-RPC request, with its error code
+    '''
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+def warm_worker():
+    '''
+    Function run once by each worker process, so that it is started with the service
+    '''
+    return os.getpid()
+
+def convert_request(path, content, style_level, table_layout):
+    '''
+    Function to convert a file for a request, used by the worker processes
+    The content of the file, when it is given, is written to a temporary file first
+    Returns the JSON of the file as compact text
+    '''
+    temporary_path = None
+    if content is not None:
+        descriptor, temporary_path = tempfile.mkstemp(suffix=".rtf")
+        with os.fdopen(descriptor, 'wb') as rtf_file:
+            rtf_file.write(content)
+        path = temporary_path
+    try:
+        json_dictionary = data_extraction.convert(path, style_level, table_layout)
+        return "".join(json_creation.iter_json(json_dictionary, indent=None,
+                                               separators=json_creation.COMPACT_SEPARATORS))
+    finally:
+        if temporary_path is not None:
+            os.remove(temporary_path)
+
+def convert_params(params):
+    '''
+    Function to read the parameters of a "convert" request
+    Returns the arguments of convert_request
+    '''
+    if not isinstance(params, dict):
+        raise RequestError(INVALID_PARAMS, "params must be an object")
+    path = params.get("path")
+    content = params.get("content")
+    if (path is None) == (content is None):
+        raise RequestError(INVALID_PARAMS, "Give either the path or the content of the file")
+    if path is not None:
+        if not isinstance(path, str) or not os.path.isfile(path):
+            raise RequestError(INVALID_PARAMS, f"{path} is not a file")
+        path = os.path.abspath(path)
+    else:
+        try:
+            content = base64.b64decode(content, validate=True)
+        except (TypeError, ValueError) as e:
+            raise RequestError(INVALID_PARAMS, f"content is not valid base64: {e}") from e
+    style_level = params.get("style_level", "None")
+    if style_level not in ("None", "ALL"):
+        raise RequestError(INVALID_PARAMS, "style_level must be \"None\" or \"ALL\"")
+    table_layout = params.get("table_layout", "rows")
+    if table_layout not in ("rows", "columns"):
+        raise RequestError(INVALID_PARAMS, "table_layout must be \"rows\" or \"columns\"")
+    return path, content, style_level, table_layout
+
+class ConversionService:
+    '''
+    Class for the conversion service, with its warm pool of worker processes
+    At most one request for each worker process is converted at a time, and at most
+    the queue size of requests wait for a worker, the others are turned away as busy
+    '''
+    def __init__(self, workers=0, queue_size=QUEUE_SIZE):
+        self.workers = batch_processing.worker_count(workers)
+        self.capacity = self.workers + queue_size
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.served = 0
+        self.records = None
+        self.executor = None
+
+    def start(self):
+        '''
+        Function to start the worker processes and wait until they are all ready
+        The configuration is read first, so a bad configuration stops the service
+        with its ConfigurationError instead of breaking each worker process
+        '''
+        configuration.get_config()
+        self.records = logging.start_worker_logging()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            initializer=batch_processing.start_worker,
+                                            initargs=(self.records,))
+        wait([self.executor.submit(warm_worker) for _ in range(self.workers)])
+
+    def stop(self):
+        '''
+        Function to stop the worker processes once the requests being converted are finished
+        '''
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            logging.stop_worker_logging(self.records)
+            self.records = None
+
+    def status(self):
+        '''
+        Function to give the number of worker processes and of requests being served
+        '''
+        with self.lock:
+            return {"workers": self.workers, "capacity": self.capacity,
+                    "pending": self.pending, "served": self.served}
+
+    def convert(self, params):
+        '''
+        Function to convert the file of a "convert" request
+        Returns the JSON of the file as text
+        '''
+        arguments = convert_params(params)
+        if not self.slots.acquire(blocking=False):
+            raise RequestError(BUSY_ERROR, "The service is busy, retry later")
+        with self.lock:
+            self.pending += 1
+        try:
+            future = self.executor.submit(convert_request, *arguments)
+            try:
+                return future.result()
+            except ValueError as e:
+                raise RequestError(CONVERSION_ERROR, str(e)) from e
+            except Exception as e:
+                logging.write_exceptions(f"{arguments[0] or 'content'} cannot be converted "
+                                         f"due to {e}\n", file=arguments[0],
+                                         stage="service", error=str(e))
+                raise RequestError(CONVERSION_ERROR, f"The file cannot be converted: {e}") from e
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.served += 1
+            self.slots.release()
+
+    def call(self, request):
+        '''
+        Function to answer a JSON-RPC request
+        Returns the JSON-RPC response as text, or None for a notification,
+        along with the error code when the request failed
+        '''
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or \
+                not isinstance(request.get("method"), str):
+            return (error_response(None, INVALID_REQUEST, "Invalid JSON-RPC 2.0 request"),
+                    INVALID_REQUEST)
+        request_id = request.get("id")
+        method = request["method"]
+        try:
+            if method == "convert":
+                result = self.convert(request.get("params", {}))
+            elif method == "status":
+                result = json.dumps(self.status())
+            else:
+                raise RequestError(METHOD_NOT_FOUND, f"Method {method} not found")
+        except RequestError as e:
+            if "id" not in request:
+                return None, e.code
+            return error_response(request_id, e.code, str(e)), e.code
+        if "id" not in request:
+            return None, None
+        # The result is already JSON text, so it is put into the response as it is
+        return f'{{"jsonrpc":"2.0","id":{json.dumps(request_id)},"result":{result}}}', None
+
+def error_response(request_id, code, message):
+    '''
+    Function to create the JSON-RPC response of an error
+    '''
+    return json.dumps({"jsonrpc": "2.0", "id": request_id,
+                       "error": {"code": code, "message": message}})
+
+class RequestHandler(BaseHTTPRequestHandler):
+    '''
+    Class to answer the HTTP requests of the service
+    The JSON-RPC requests are sent by POST, and GET gives the status of the service
+    '''
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, text, headers=()):
+        '''
+        Function to send a JSON answer
+        '''
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        '''
+        Function to answer the status of the service
+        '''
+        self.send_json(200, json.dumps(self.server.service.status()))
+
+    def do_POST(self):
+        '''
+        Function to answer a JSON-RPC request
+        '''
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_json(411, error_response(None, INVALID_REQUEST, "Content-Length is needed"))
+            return
+        if length > MAX_REQUEST_SIZE:
+            self.close_connection = True
+            self.send_json(413, error_response(None, INVALID_REQUEST, "Request is too large"))
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self.send_json(400, error_response(None, PARSE_ERROR, f"Parse error: {e}"))
+            return
+        response, code = self.server.service.call(request)
+        if response is None:
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if code == BUSY_ERROR:
+            self.send_json(503, response, [("Retry-After", str(RETRY_AFTER))])
+            return
+        self.send_json(200, response)
+
+    def log_message(self, format, *args):
+        '''
+        Function to leave the requests out of the standard error, they are shown when debugging
+        '''
+        data_extraction.debug_print(f"{self.address_string()} {format % args}")
+
+class ServiceServer(ThreadingHTTPServer):
+    '''
+    Class for the HTTP server of the service, answering each connection on its own thread
+    '''
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, RequestHandler)
+        self.service = service
+
+def serve(service, host=HOST, port=PORT, stop_event=None, ready=None):
+    '''
+    Function to run the service until the stop event is set
+    The worker processes are started before the first request is accepted,
+    and the ready function is given the address the service listens on
+    '''
+    service.start()
+    try:
+        server = ServiceServer((host, port), service)
+    except OSError:
+        service.stop()
+        raise
+    thread = threading.Thread(target=server.serve_forever, name="conversion service",
+                              daemon=True)
+    thread.start()
+    try:
+        if ready is not None:
+            ready(server.server_address)
+        if stop_event is None:
+            stop_event = threading.Event()
+        stop_event.wait()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        service.stop()
@@ -0,0 +1,221 @@
+'''
+This module is used to watch input folders and convert the RTF files dropped into them
+Each folder is scanned at an interval, and a file that is new or has changed since it
+was last converted is queued once its size and modification time have stopped changing,
+so a file that is still being written is not converted half way
+The queued files are converted by a pool of worker processes, a few at a time,
+into the Output folder of their input folder
+The manifest of each output folder is kept up to date, so the files that were
+converted before the watcher was started are not converted again
+'''
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from BatchProcessing import batch_processing, manifest
+from DataExtraction import data_extraction
+from Logger import logging
+
+# Seconds between two scans of the folders
+SCAN_INTERVAL = 2.0
+
+# Seconds the size and modification time of a file must stay the same before it is converted
+SETTLE_TIME = 2.0
+
+def scan_folder(folder):
+    '''
+    Function to get the size and modification time of each RTF file of a folder
+    '''
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.rtf'):
+                continue
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            # The file was removed while the folder was scanned
+            except FileNotFoundError:
+                continue
+    return files
+
+class FolderWatcher:
+    '''
+    Class for the watcher of a set of input folders
+    A file is queued once it has kept the same size and modification time for the
+    settle time, and the queued files are converted by the worker processes
+    with at most batch_processing.TASKS_PER_WORKER files given to each worker at a time
+    A file queued again while it is being converted waits until its conversion is finished,
+    so the same output is never written by two worker processes
+    '''
+    def __init__(self, folders, workers=0, output_format="json", table_layout="rows",
+                 scan_interval=SCAN_INTERVAL, settle_time=SETTLE_TIME, style_level="None"):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.workers = batch_processing.worker_count(workers)
+        self.output_format = output_format
+        self.table_layout = table_layout
+        self.style_level = style_level
+        self.scan_interval = scan_interval
+        self.settle_time = settle_time
+        self.config = manifest.config_hash(output_format, table_layout,
+                                           style_level=style_level)
+        # Size and modification time of the files that are changing, with the time
+        # they were first seen with them, and of the files last queued
+        self.changing = {}
+        self.queued = {}
+        self.queue = deque()
+        self.running = {}
+        # Files queued again while they were being converted
+        self.deferred = set()
+        self.manifests = {}
+        self.file_no = 0
+
+    def output_directory(self, folder):
+        '''
+        Function to get the output folder of an input folder
+        '''
+        return os.path.join(folder, 'Output')
+
+    def get_manifest(self, folder):
+        '''
+        Function to get the manifest of the output folder of an input folder
+        '''
+        if folder not in self.manifests:
+            output_directory = self.output_directory(folder)
+            os.makedirs(output_directory, exist_ok=True)
+            self.manifests[folder] = manifest.Manifest(output_directory).load()
+        return self.manifests[folder]
+
+    def is_settled(self, key, signature, now):
+        '''
+        Function to check if a file has stopped changing
+        A file seen for the first time has settled when it was last modified
+        longer ago than the settle time, otherwise it must keep the same size and
+        modification time for the settle time
+        '''
+        previous = self.changing.get(key)
+        if previous is None:
+            self.changing[key] = (signature, now)
+            return time.time() - signature[1] / 1e9 >= self.settle_time
+        if previous[0] != signature:
+            self.changing[key] = (signature, now)
+            return False
+        return now - previous[1] >= self.settle_time
+
+    def scan(self):
+        '''
+        Function to scan the folders and queue the files that are new or have changed,
+        once they have settled
+        '''
+        now = time.monotonic()
+        for folder in self.folders:
+            try:
+                files = scan_folder(folder)
+            except OSError as e:
+                data_extraction.debug_print(f"Folder {folder} cannot be scanned: {e}")
+                continue
+            # Files that were removed are forgotten, so they are converted if they come back
+            for key in [key for key in self.queued if key[0] == folder and key[1] not in files]:
+                del self.queued[key]
+            for key in [key for key in self.changing
+                        if key[0] == folder and key[1] not in files]:
+                del self.changing[key]
+            for file, signature in files.items():
+                key = (folder, file)
+                if self.queued.get(key) == signature:
+                    continue
+                if self.is_settled(key, signature, now):
+                    del self.changing[key]
+                    self.queued[key] = signature
+                    self.queue.append(key)
+
+    def submit(self, executor):
+        '''
+        Function to give the queued files to the worker processes
+        '''
+        tasks = self.workers * batch_processing.TASKS_PER_WORKER
+        running_files = set(self.running.values())
+        while self.queue and len(self.running) < tasks:
+            key = self.queue.popleft()
+            if key in running_files:
+                self.deferred.add(key)
+                continue
+            folder, file = key
+            file_manifest = self.get_manifest(folder)
+            task = batch_processing.ConversionTask(file, self.file_no, folder,
+                                                   self.output_directory(folder),
+                                                   self.output_format, file_manifest.get(file),
+                                                   self.config, table_layout=self.table_layout,
+                                                   style_level=self.style_level)
+            self.file_no += 1
+            self.running[executor.submit(batch_processing.convert_file, task)] = key
+            running_files.add(key)
+
+    def collect(self, timeout):
+        '''
+        Function to wait for conversions to finish, for at most the timeout
+        Returns the folder and result of each file that was converted
+        The files queued again while they were converted are put back in the queue
+        '''
+        done, _ = wait(self.running, timeout=timeout, return_when=FIRST_COMPLETED)
+        results = []
+        for future in done:
+            key = self.running.pop(future)
+            folder, file = key
+            if key in self.deferred:
+                self.deferred.discard(key)
+                self.queue.append(key)
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.write_exceptions(datetime.now().isoformat() + "\n" + file +
+                                         " cannot be converted due to " + str(e) + "\n",
+                                         file=file, stage="watcher", error=str(e))
+                result = batch_processing.FileResult(file, "Failed", "Not in Scope", 'red',
+                                                     False, 0, 0, 0.0)
+            if result.entry is not None:
+                self.get_manifest(folder).record(result.entry)
+            results.append((folder, result))
+        return results
+
+    def run(self, stop_event=None, report=None):
+        '''
+        Function to watch the folders until the stop event is set
+        The folder and result of each converted file are given to the report function
+        When stopped, the files being converted are finished and recorded,
+        and the queued files are left for the next run
+        '''
+        records = logging.start_worker_logging()
+        executor = ProcessPoolExecutor(max_workers=self.workers,
+                                       initializer=batch_processing.start_worker,
+                                       initargs=(records,))
+        next_scan = time.monotonic()
+        try:
+            while stop_event is None or not stop_event.is_set():
+                if time.monotonic() >= next_scan:
+                    self.scan()
+                    next_scan = time.monotonic() + self.scan_interval
+                self.submit(executor)
+                timeout = max(next_scan - time.monotonic(), 0)
+                if not self.running:
+                    if stop_event is not None:
+                        stop_event.wait(timeout)
+                    else:
+                        time.sleep(timeout)
+                    continue
+                for folder, result in self.collect(timeout):
+                    if report is not None:
+                        report(folder, result)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for folder, result in self.collect(0):
+                if report is not None:
+                    report(folder, result)
+            logging.stop_worker_logging(records)
+            for file_manifest in self.manifests.values():
+                file_manifest.close()
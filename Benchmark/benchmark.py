@@ -0,0 +1,299 @@
+'''
+This module is used to benchmark the RTF to JSON conversion
+Synthetic RTF files are generated for each benchmark case, and the conversion
+is timed end to end, along with each stage of the conversion on its own
+The time taken to import the conversion modules in a new interpreter is also timed,
+as every worker process and short-lived job pays it
+The results are written as JSON, and can be compared with an earlier run
+saved as a baseline, so that a slower conversion is found before it is released
+It is run from the folder holding config.ini, in the same way as facade.py:
+
+    python -m Benchmark.benchmark [--output RESULTS_FILE] [--baseline BASELINE_FILE]
+                                  [--repeats N] [--tolerance PERCENT] [--case NAME]
+                                  [--skip-startup]
+
+The exit code is 1 when a case is slower than the baseline by more than the tolerance
+'''
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from Benchmark import rtf_generator
+from BatchProcessing import manifest
+from DataExtraction import data_extraction, rtf_tokenizer
+from JSONCreation import json_creation
+
+# Benchmark cases, with the arguments of the RTF generator and the style level
+BENCHMARK_CASES = {
+    "small": {"pages": 5, "rows": 20, "columns": 5, "styles": 1},
+    "listing": {"pages": 200, "rows": 40, "columns": 6, "styles": 2},
+    "wide": {"pages": 50, "rows": 40, "columns": 24, "styles": 2},
+    "styled": {"pages": 50, "rows": 40, "columns": 6, "styles": 6, "style_level": "ALL"},
+    "large": {"size_mb": 25, "rows": 40, "columns": 6, "styles": 2},
+}
+
+# Extraction functions that are timed on their own
+EXTRACTION_STAGES = ["extract_header", "extract_title", "extract_column_headers",
+                     "extract_table_data", "extract_footnotes", "extract_footer"]
+
+# Modules whose import is timed, as they are imported by every worker process
+STARTUP_MODULES = ["DataExtraction.data_extraction", "JSONCreation.json_creation",
+                   "BatchProcessing.batch_processing"]
+
+# Folder holding the packages, added to the path of the interpreters started for the imports
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default slowdown of a case against the baseline, in percent, before it is reported
+DEFAULT_TOLERANCE = 10.0
+
+def timed(function, timings, name):
+    '''
+    Function to wrap a function so that the time spent in it is added to the timings
+    For a generator function, only the time spent producing each item is added
+    '''
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+    def generator_wrapper(*args, **kwargs):
+        items = function(*args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+            yield item
+
+    return generator_wrapper if inspect.isgeneratorfunction(function) else wrapper
+
+def time_stages(rtf_file, output_directory, style_level):
+    '''
+    Function to time each stage of the conversion of a file
+    The extraction functions are wrapped while the file is converted, and the pages
+    are extracted before the JSON file is written, so that the writing is timed on its own
+    '''
+    timings = {}
+    patched = [(data_extraction, name) for name in
+               ["index_stream", "normalise_text"] + EXTRACTION_STAGES]
+    patched.append((rtf_tokenizer, "parse_pages"))
+    originals = [(module, name, getattr(module, name)) for module, name in patched]
+
+    def write_json(json_dictionary, item, output_directory, write_success):
+        json_dictionary['data'] = list(json_dictionary['data'])
+        return timed(json_creation.json_conversion, timings, "json_writing")(
+            json_dictionary, item, output_directory, write_success)
+
+    try:
+        for module, name, function in originals:
+            setattr(module, name, timed(function, timings, name))
+        context = data_extraction.ConversionContext(style_level)
+        status, remarks = data_extraction.convert_rtf(rtf_file, 0, output_directory,
+                                                      write_json, context)
+    finally:
+        for module, name, function in originals:
+            setattr(module, name, function)
+    if status != "Successful":
+        raise RuntimeError(f"{rtf_file} was not converted: {remarks}")
+    return timings
+
+def time_conversion(rtf_file, output_directory, style_level, repeats):
+    '''
+    Function to time the conversion of a file end to end
+    Returns the time of each run, and the number of pages of the file
+    '''
+    seconds = []
+    for _ in range(repeats):
+        context = data_extraction.ConversionContext(style_level)
+        start = time.perf_counter()
+        status, remarks = data_extraction.convert_rtf(rtf_file, 0, output_directory,
+                                                      json_creation.json_conversion, context)
+        seconds.append(time.perf_counter() - start)
+        if status != "Successful":
+            raise RuntimeError(f"{rtf_file} was not converted: {remarks}")
+    return seconds, context.numpages
+
+def run_case(name, case, work_directory, repeats):
+    '''
+    Function to generate the RTF file of a case and time its conversion
+    '''
+    style_level = case.get("style_level", "None")
+    pages = case.get("pages", 10)
+    if case.get("size_mb"):
+        pages = rtf_generator.pages_for_size(case["size_mb"], case["rows"], case["columns"],
+                                             case["styles"])
+    rtf_file = os.path.join(work_directory, f"{name}.rtf")
+    size = rtf_generator.write_rtf(rtf_file, pages, case["rows"], case["columns"],
+                                   case["styles"])
+
+    seconds, numpages = time_conversion(rtf_file, work_directory, style_level, repeats)
+    stages = time_stages(rtf_file, work_directory, style_level)
+    median = statistics.median(seconds)
+    return {
+        "case": {"pages": pages, "rows": case["rows"], "columns": case["columns"],
+                 "styles": case["styles"], "style_level": style_level},
+        "size": size,
+        "pages": numpages,
+        "seconds": {"min": min(seconds), "median": median, "runs": seconds},
+        "mb_per_second": size / (1024 * 1024) / median,
+        "pages_per_second": numpages / median,
+        "stages": stages,
+    }
+
+def time_interpreter(code, work_directory):
+    '''
+    Function to time a new interpreter running the code, from start to exit
+    '''
+    environment = dict(os.environ, PYTHONPATH=PACKAGE_DIRECTORY)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=work_directory, env=environment,
+                   check=True)
+    return time.perf_counter() - start
+
+def run_startup(repeats):
+    '''
+    Function to time the import of each startup module in a new interpreter
+    The interpreters are started in an empty folder, so that the files an import
+    creates, such as log files, are found
+    The time taken by an interpreter that imports nothing is given as the baseline
+    '''
+    with tempfile.TemporaryDirectory() as work_directory:
+        baseline = statistics.median(time_interpreter("pass", work_directory)
+                                     for _ in range(repeats))
+        results = {"interpreter": baseline}
+        for module in STARTUP_MODULES:
+            seconds = [time_interpreter(f"import {module}", work_directory)
+                       for _ in range(repeats)]
+            median = statistics.median(seconds)
+            results[module] = {
+                "seconds": {"min": min(seconds), "median": median, "runs": seconds},
+                "import_seconds": median - baseline,
+                "files_created": sorted(os.listdir(work_directory)),
+            }
+    return results
+
+def compare_results(results, baseline, tolerance):
+    '''
+    Function to compare the results with the baseline
+    Returns a line for each case that is slower than the baseline by more than the tolerance
+    '''
+    regressions = []
+    for name, result in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None or previous["case"] != result["case"]:
+            continue
+        before = previous["seconds"]["median"]
+        after = result["seconds"]["median"]
+        change = (after - before) / before * 100
+        if change > tolerance:
+            regressions.append(f"{name}: {before:.3f} s -> {after:.3f} s (+{change:.1f}%)")
+    for module, result in results.get("startup", {}).items():
+        previous = baseline.get("startup", {}).get(module)
+        if module == "interpreter" or previous is None:
+            continue
+        before = previous["seconds"]["median"]
+        after = result["seconds"]["median"]
+        change = (after - before) / before * 100
+        if change > tolerance:
+            regressions.append(f"import {module}: {before:.3f} s -> {after:.3f} s "
+                               f"(+{change:.1f}%)")
+    return regressions
+
+def format_result(name, result):
+    '''
+    Function to create the report of a case, with the time of each stage
+    '''
+    lines = [f"{name}: {result['pages']} pages, {result['size'] / (1024 * 1024):.2f} MB, "
+             f"median {result['seconds']['median']:.3f} s, "
+             f"{result['mb_per_second']:.2f} MB/s, {result['pages_per_second']:.1f} pages/s"]
+    for stage, seconds in result["stages"].items():
+        lines.append(f"    {stage:<24} {seconds:8.3f} s")
+    return "\n".join(lines)
+
+def format_startup(startup):
+    '''
+    Function to create the report of the import times
+    '''
+    lines = [f"startup: interpreter {startup['interpreter']:.3f} s"]
+    for module in STARTUP_MODULES:
+        result = startup[module]
+        line = (f"    import {module:<34} {result['seconds']['median']:8.3f} s "
+                f"({result['import_seconds']:+.3f} s)")
+        if result["files_created"]:
+            line += f", created {', '.join(result['files_created'])}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def parse_arguments(arguments=None):
+    '''
+    Function to read the command line arguments
+    '''
+    parser = argparse.ArgumentParser(prog="python -m Benchmark.benchmark",
+                                     description="Benchmark the RTF to JSON conversion")
+    parser.add_argument("-o", "--output", default="benchmark_results.json",
+                        help="file to write the results to (default: benchmark_results.json)")
+    parser.add_argument("-b", "--baseline",
+                        help="results of an earlier run to compare the results with")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+                        help="number of timed conversions of each file (default: 3)")
+    parser.add_argument("-t", "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown against the baseline that is reported, in percent "
+                             f"(default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("-c", "--case", action="append", choices=sorted(BENCHMARK_CASES),
+                        help="case to run, can be given more than once (default: all cases)")
+    parser.add_argument("-s", "--skip-startup", action="store_true",
+                        help="do not time the import of the conversion modules")
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    '''
+    Function to run the benchmark cases and write the results
+    Returns the exit code of the command
+    '''
+    arguments = parse_arguments(arguments)
+    results = {
+        "created": datetime.now().isoformat(),
+        "converter_version": manifest.CONVERTER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": arguments.repeats,
+        "cases": {},
+    }
+    if not arguments.skip_startup:
+        results["startup"] = run_startup(arguments.repeats)
+        print(format_startup(results["startup"]), flush=True)
+    with tempfile.TemporaryDirectory() as work_directory:
+        for name in arguments.case or BENCHMARK_CASES:
+            result = run_case(name, BENCHMARK_CASES[name], work_directory, arguments.repeats)
+            results["cases"][name] = result
+            print(format_result(name, result), flush=True)
+
+    with open(arguments.output, 'w', encoding="utf-8") as results_file:
+        json.dump(results, results_file, indent=4)
+    print(f"Results written to {arguments.output}")
+
+    if arguments.baseline:
+        with open(arguments.baseline, 'r', encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(results, baseline, arguments.tolerance)
+        for regression in regressions:
+            print(f"Slower than the baseline: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
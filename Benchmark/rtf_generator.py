@@ -0,0 +1,141 @@
+'''
+This module is used to generate synthetic RTF files for the benchmarks
+The files follow the layout of the TLF listings the converter is built for:
+a page header with the protocol and page number fields, title rows and a column
+headers row marked by the '\trhdr' RTF tag, the subject rows, and a footnote row
+marked by the '\keepn' RTF tag, with a '\endnhere' page break before every page
+It can be run from the command line to write a file:
+
+    python -m Benchmark.rtf_generator OUTPUT_FILE [--pages N] [--rows N]
+                                      [--columns N] [--styles N] [--size-mb N]
+'''
+import argparse
+import random
+
+PAGE_WIDTH = 12960
+
+FONT_NAMES = ["Times New Roman", "Arial", "Courier New", "Calibri", "Verdana", "Georgia"]
+
+# Values the subject cells are filled with
+# Unicode escapes are followed by the '?' fallback character, as '\uc1' is set
+CELL_VALUES = ["12", "3.5", "M", "F", "10 (12.5%)", "", "Not done", "\\u8805? 65"]
+
+def cell_boundaries(columns):
+    '''
+    Function to create the cell boundaries of a table row
+    '''
+    return "".join(f"\\clvertalb\\clpadt0\\clpadft3\\cellx{PAGE_WIDTH * (i + 1) // columns}"
+                   for i in range(columns))
+
+def table_row(cells, style=1, header=False, keep_next=False, alignment="l"):
+    '''
+    Function to create a table row with one paragraph for each cell
+    The style number selects the font and colour of the row, and every other
+    style is written in bold
+    '''
+    parts = ["\\trowd\\trkeep", "\\trhdr" if header else "", "\\trqc\\trgaph0\\trleft0\n",
+             cell_boundaries(len(cells)), "\n"]
+    keep = "\\keepn" if keep_next else ""
+    bold = "\\b" if style % 2 == 0 else ""
+    for cell in cells:
+        parts.append(f"\\pard\\plain\\intbl{keep}\\sb0\\sa0"
+                     f"\\q{alignment}\\f{style}\\fs18\\cf{style}{bold}{{{cell}\\cell}}\n")
+    parts.append("{\\row}\n")
+    return "".join(parts)
+
+def page_header():
+    '''
+    Function to create the page header group, with the page number fields
+    '''
+    return ("{\\header\\pard\\plain\n"
+            "\\trowd\\trkeep\\trgaph0\\trleft0\n" + cell_boundaries(2) + "\n"
+            "\\pard\\plain\\intbl\\sb0\\sa0\\ql\\f1\\fs18\\cf1{Protocol: XYZ-123\\cell}\n"
+            "\\pard\\plain\\intbl\\sb0\\sa0\\qr\\f1\\fs18\\cf1{Page "
+            "{\\field{\\*\\fldinst { PAGE }}}{ of }{\\field{\\*\\fldinst { NUMPAGES }}}\\cell}\n"
+            "{\\row}\n}\n")
+
+def document_tables(styles):
+    '''
+    Function to create the font and colour tables, with one font and colour for each style
+    '''
+    fonts = "".join(f"{{\\f{i}\\froman\\fprq2\\fcharset0 {FONT_NAMES[(i - 1) % len(FONT_NAMES)]};}}"
+                    "\n" for i in range(1, styles + 1))
+    colours = "".join(f"\\red{(i * 40) % 256}\\green{(i * 70) % 256}\\blue{(i * 110) % 256};"
+                      for i in range(1, styles + 1))
+    return f"{{\\fonttbl\n{fonts}}}\n{{\\colortbl;{colours}}}\n"
+
+def generate_rtf(pages=10, rows=40, columns=6, styles=2, seed=0):
+    '''
+    Function to generate the content of a synthetic RTF file
+    The same arguments always give the same content
+    '''
+    columns = max(columns, 2)
+    styles = max(styles, 1)
+    generator = random.Random(seed)
+    parts = ["{\\rtf1\\ansi\\ansicpg1252\\uc1\\deff0\\deflang1033\\deflangfe1033\n",
+             document_tables(styles)]
+    subject = 0
+    for page in range(1, pages + 1):
+        parts.append("\\sectd\\linex0\\endnhere\\sbkpage\\pgwsxn15840\\pghsxn12240\n")
+        parts.append(page_header())
+        parts.append(table_row([f"Table 14.1.{page}"], header=True, alignment="c"))
+        parts.append(table_row(["Demographics \\u8804? Safety{\\line}\nPopulation"],
+                               header=True, alignment="c"))
+        parts.append(table_row(["Subject"] + [f"Col {column}" for column in range(1, columns)],
+                               header=True, alignment="c"))
+        for row in range(rows):
+            subject += 1
+            cells = [f"{subject:04d}"] + [generator.choice(CELL_VALUES)
+                                          for _ in range(1, columns)]
+            parts.append(table_row(cells, style=row % styles + 1))
+        parts.append(table_row(["Note: values are illustrative. Source: ADSL"], keep_next=True))
+        parts.append("\\pard\\sect\n")
+    parts.append("}\n")
+    return "".join(parts)
+
+def pages_for_size(size_mb, rows=40, columns=6, styles=2):
+    '''
+    Function to get the number of pages that gives a file of about the given size
+    '''
+    page_size = (len(generate_rtf(2, rows, columns, styles))
+                 - len(generate_rtf(1, rows, columns, styles)))
+    return max(1, round(size_mb * 1024 * 1024 / page_size))
+
+def write_rtf(file_path, pages=10, rows=40, columns=6, styles=2, seed=0):
+    '''
+    Function to write a synthetic RTF file
+    Returns the size of the file in bytes
+    '''
+    content = generate_rtf(pages, rows, columns, styles, seed).encode("utf-8")
+    with open(file_path, 'wb') as file:
+        file.write(content)
+    return len(content)
+
+def main(arguments=None):
+    '''
+    Function to write a synthetic RTF file from the command line arguments
+    '''
+    parser = argparse.ArgumentParser(prog="python -m Benchmark.rtf_generator",
+                                     description="Generate a synthetic TLF RTF file")
+    parser.add_argument("output_file", help="RTF file to write")
+    parser.add_argument("--pages", type=int, default=10, help="number of pages (default: 10)")
+    parser.add_argument("--rows", type=int, default=40,
+                        help="number of subject rows on each page (default: 40)")
+    parser.add_argument("--columns", type=int, default=6,
+                        help="number of columns (default: 6)")
+    parser.add_argument("--styles", type=int, default=2,
+                        help="number of fonts and colours the rows use (default: 2)")
+    parser.add_argument("--size-mb", type=float,
+                        help="size of the file in MB, which sets the number of pages")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the cell values")
+    arguments = parser.parse_args(arguments)
+    pages = arguments.pages
+    if arguments.size_mb:
+        pages = pages_for_size(arguments.size_mb, arguments.rows, arguments.columns,
+                               arguments.styles)
+    size = write_rtf(arguments.output_file, pages, arguments.rows, arguments.columns,
+                     arguments.styles, arguments.seed)
+    print(f"{arguments.output_file}: {pages} pages, {size / (1024 * 1024):.2f} MB")
+
+if __name__ == "__main__":
+    main()
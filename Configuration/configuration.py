@@ -0,0 +1,114 @@
+'''
+This module is used to load the configuration once for all the modules
+The config.ini file is read on first use, and every regular expression of the
+'RE EXPRESSIONS' section is compiled and checked when it is loaded,
+so a bad pattern stops the program at startup instead of failing the files of a batch
+'''
+import os
+import re
+from configparser import ConfigParser
+
+CONFIG_FILE = "config.ini"
+
+# The config.ini file beside the user interface, used when there is none in the working folder
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "Facade", CONFIG_FILE)
+
+REQUIRED_SECTIONS = ["DEBUG FLAG", "RTF TAGS", "RE EXPRESSIONS", "HEADER ALIGNMENT",
+                     "LOG FILE DETAILS", "RTF STYLE TAGS"]
+
+# Flags each pattern is compiled with
+PATTERN_FLAGS = {
+    "font table": re.DOTALL,
+}
+
+# Number of groups each pattern must capture, as the extractors read the groups by position
+PATTERN_GROUPS = {
+    "font table": 1,
+    "font pattern": 2,
+    "colour pattern": 3,
+    "styles": 3,
+}
+
+class ConfigurationError(Exception):
+    '''
+    Error raised when the configuration file is missing or holds a bad setting
+    '''
+
+# The configuration and the compiled patterns, loaded on first use
+config_object = None
+config_path = None
+patterns = None
+
+def find_config():
+    '''
+    Function to find the config.ini file
+    The file in the working folder is used if there is one
+    '''
+    if os.path.isfile(CONFIG_FILE):
+        return os.path.abspath(CONFIG_FILE)
+    return DEFAULT_CONFIG_FILE
+
+def compile_patterns(config):
+    '''
+    Function to compile each regular expression of the configuration
+    Returns a dictionary of the compiled patterns by name
+    '''
+    compiled = {}
+    for name, pattern in config["RE EXPRESSIONS"].items():
+        try:
+            compiled[name] = re.compile(pattern, PATTERN_FLAGS.get(name, 0))
+        except re.error as e:
+            raise ConfigurationError(
+                f"Pattern '{name}' = {pattern} in [RE EXPRESSIONS] of {config_path} "
+                f"is not a valid regular expression: {e}") from e
+        groups = PATTERN_GROUPS.get(name)
+        if groups is not None and compiled[name].groups != groups:
+            raise ConfigurationError(
+                f"Pattern '{name}' = {pattern} in [RE EXPRESSIONS] of {config_path} "
+                f"must capture {groups} groups, not {compiled[name].groups}")
+    missing = sorted(set(PATTERN_GROUPS) - set(compiled))
+    if missing:
+        raise ConfigurationError(
+            f"Patterns {', '.join(missing)} are missing from [RE EXPRESSIONS] of {config_path}")
+    return compiled
+
+def load_config():
+    '''
+    Function to read the config.ini file and compile its patterns
+    The file is only read the first time, later calls give the same configuration
+    '''
+    global config_object, config_path, patterns
+    if config_object is not None:
+        return config_object
+    path = find_config()
+    config = ConfigParser()
+    if not config.read(path, encoding="utf-8"):
+        raise ConfigurationError(f"Configuration file {path} cannot be read")
+    missing = [section for section in REQUIRED_SECTIONS if not config.has_section(section)]
+    if missing:
+        raise ConfigurationError(f"Sections {', '.join(missing)} are missing from {path}")
+    config_path = path
+    patterns = compile_patterns(config)
+    config_object = config
+    return config_object
+
+def get_config():
+    '''
+    Function to get the configuration
+    '''
+    return load_config()
+
+def get_config_path():
+    '''
+    Function to get the path of the config.ini file that was read
+    '''
+    load_config()
+    return config_path
+
+def get_pattern(name):
+    '''
+    Function to get a compiled pattern of the configuration by name
+    '''
+    load_config()
+    return patterns[name]
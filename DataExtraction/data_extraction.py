@@ -1,65 +1,177 @@
+import codecs
+import mmap
 import os
 import re
-from configparser import ConfigParser
+from contextlib import contextmanager
 from datetime import datetime
+from Configuration import configuration
 from Logger import logging
+from DataExtraction import rtf_tokenizer
+from Tracing import tracing
 
-# Read config.ini file
-config_object = ConfigParser()
-config_object.read("config.ini")
+# The config.ini file is read, and the log files are opened, on first use,
+# so that this module can be imported as a library without any file being touched
 
-# Get the RTF tags, RE expressions and alignment data from the config file
-Debug_flag = config_object["DEBUG FLAG"]
-RTF_tags = config_object["RTF TAGS"]
-RE_expressions = config_object["RE EXPRESSIONS"]
-Header_alignment = config_object['HEADER ALIGNMENT']
-Log_files = config_object['LOG FILE DETAILS']
-RTF_Style_Tags = config_object['RTF STYLE TAGS']
+# Global debugging flag, read from the config file on first use
+DEBUG = None
 
-logging.start_logging()
 
-# Global debugging flag
-DEBUG = Debug_flag["debug"]
-json_dictionary = {}
-STYLE_LEVEL = "None"
+class ConversionContext:
+    '''
+    This class holds the state of a single RTF file conversion
+    The page being extracted, the number of pages, the style level
+    and the JSON dictionary of the file are kept here instead of in module variables,
+    so that several files can be converted at the same time
+    The stages of the conversion are recorded by the tracer when one is given
+    The styles found in the file are kept in its style table, by style id
+    The file and page are given with the records logged while the file is converted
+    The table data is given as one dictionary for each row, or as one list of values
+    for each column when the table layout is "columns"
+    '''
+    def __init__(self, style_level="None", tracer=None, table_layout="rows"):
+        self.file = None
+        self.page = 0
+        self.numpages = 0
+        self.style_level = style_level
+        self.table_layout = table_layout
+        self.json_dictionary = {}
+        self.tracer = tracer
+        self.style_table = {}
+        # Style id of each distinct style, and of each segment already looked up
+        self.style_ids = {}
+        self.segment_styles = {}
+        # Number of fallback characters after each '\uN' escape, set in the document header
+        self.unicode_fallback = rtf_tokenizer.UNICODE_FALLBACK
+
 
-# global PAGE variable declaration to count the number of pages
-PAGE = 0
-NUMPAGES = 0
+def config_section(name):
+    '''
+    This function gives a section of the config file, which is read on first use
+    '''
+    return configuration.get_config()[name]
 
 def debug_print(message):
     '''
     This function serves as the debugging switch
     '''
-    if DEBUG != "False":
+    global DEBUG
+    if DEBUG is None:
+        DEBUG = config_section("DEBUG FLAG")["debug"] != "False"
+    if DEBUG:
         print(message)
 
-def check_rtf(file_path):
+@contextmanager
+def open_rtf(file_path):
+    '''
+    This function gives the raw bytes of the RTF file, mapped into memory
+    The same bytes are shared by the schema check and the conversion,
+    so the file is only read once
+    '''
+    with open(file_path, 'rb') as file:
+        # An empty file cannot be mapped into memory
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as raw_content:
+            yield raw_content
+
+def check_rtf(file_path, raw_content=None):
     '''
     This is a function that checks whether the RTF File adheres to the schema mentioned.
     The adherence to the schema is found by checking whether
     the commonly used RTF control tags are used in the RTF file.
-    The RTF file is loaded, and then the content is read using the "file.read()" function
+    The tags are searched for in the raw bytes of the RTF file, chunk by chunk,
+    which are read from the file path unless they are given
     A list is created to store the RTF tags
-    An iterator is used to parse the list and check if all the tags are present in the file
+    All the tags missing from the file are reported together
     '''
-    with open(file_path, 'r', encoding = "utf-8") as file:
-        rtf_content = file.read().replace("{\\line}\n", " ").replace("\\~", " ")
+    if raw_content is None:
+        with open(file_path, 'rb') as rtf_file:
+            return check_rtf(file_path, rtf_file)
     # Commonly used RTF tags
+    RTF_tags = config_section("RTF TAGS")
     rtf_tags = [RTF_tags['header'],
                 RTF_tags['title'],RTF_tags["row start"],
                 RTF_tags["row end"],RTF_tags["cell end"]]
-    flag = True
-    for i in rtf_tags:
-        if i in rtf_content:
-            continue
-
-        debug_print(i + " not in rtf")
-        # If RTF tag is not present, the RTF does not adhere to the schema
-        logging.write_exceptions(i + " not in RTF \n")
-        flag = False
-        break
-    return flag
+    missing = missing_tags(raw_content, rtf_tags)
+    if not missing:
+        return True
+
+    debug_print(", ".join(missing) + " not in rtf")
+    # If RTF tag is not present, the RTF does not adhere to the schema
+    logging.write_exceptions(", ".join(missing) + " not in RTF \n", file=file_path,
+                             stage="check_rtf")
+    return False
+
+def tags_pattern(tags):
+    '''
+    This function gives the pattern matching any of the tags
+    Longer tags come first, so a tag that begins another one does not hide it
+    '''
+    return re.compile(b"|".join(re.escape(tag) for tag in sorted(tags, key=len, reverse=True)))
+
+def missing_tags(raw_content, tags):
+    '''
+    This function finds the tags that are not in the raw bytes of the RTF file
+    Each chunk is read once and searched for all the tags not seen yet in a single pass,
+    so the search stops as soon as every tag has been seen
+    Once a tag is seen, the search carries on from the same place without it
+    The last tag is searched for on its own, which is quicker than the pattern
+    The end of each chunk is kept with the next one, so that a tag split across
+    two chunks is found
+    Returns the missing tags, in the order they are given
+    '''
+    remaining = {tag.encode("utf-8"): tag for tag in tags}
+    if not remaining:
+        return []
+    overlap = max(len(encoded) for encoded in remaining) - 1
+    tail = b""
+    for chunk in read_chunks(raw_content):
+        chunk = tail + chunk
+        position = 0
+        while len(remaining) > 1:
+            match = tags_pattern(remaining).search(chunk, position)
+            if match is None:
+                break
+            del remaining[match.group()]
+            position = match.start()
+        if len(remaining) == 1 and next(iter(remaining)) in chunk:
+            remaining.clear()
+        if not remaining:
+            return []
+        tail = chunk[max(len(chunk) - overlap, 0):]
+    return list(remaining.values())
+
+# Sequences replaced in the RTF content, in this order
+# Line controls, non-breaking spaces and page breaks become spaces
+# The character escapes are decoded by the tokenizer, in the text of the cells only
+NORMALISED_SEQUENCES = [("{\\line}\n", " "), ("\\~", " "), ("\\page", " ")]
+
+# Size of the chunks the RTF file is read in when its pages are streamed
+CHUNK_SIZE = 1024 * 1024
+
+# RTF tag that begins each page
+PAGE_BREAK_TAG = "\\endnhere"
+
+def normalise_rtf(raw_content):
+    '''
+    This function decodes the raw bytes of the RTF file,
+    and replaces the line controls, non-breaking spaces and page breaks
+    '''
+    return normalise_text(str(raw_content, "utf-8"))
+
+def normalise_text(rtf_content):
+    '''
+    This function replaces the line controls, non-breaking spaces and page breaks
+    of the decoded RTF content
+    Line breaks are made the same as when the file is read in text mode
+    Each replacement only copies the content when the sequence is found in it
+    '''
+    if "\r" in rtf_content:
+        rtf_content = rtf_content.replace("\r\n", "\n").replace("\r", "\n")
+    for sequence, replacement in NORMALISED_SEQUENCES:
+        rtf_content = rtf_content.replace(sequence, replacement)
+    return rtf_content
 
 # Function to extract font details from RTF content
 def extract_font_details(rtf_content):
@@ -70,9 +182,7 @@ def extract_font_details(rtf_content):
     These key value pairs will be used later to extract the font details on each section
     '''
     # Extract font table
-    font_table_pattern = re.compile(RE_expressions['font table'], re.DOTALL)
-
-    font_table_match = font_table_pattern.search(rtf_content)
+    font_table_match = configuration.get_pattern('font table').search(rtf_content)
     if font_table_match:
         font_table = font_table_match.group(1)
 
@@ -81,12 +191,10 @@ def extract_font_details(rtf_content):
         return {}
 
     # Extract font details from font table
-    font_pattern = re.compile(RE_expressions['font pattern'])
-
     fonts = {}
-    for match in font_pattern.finditer(font_table):
+    for match in configuration.get_pattern('font pattern').finditer(font_table):
         font_id, font_name = match.groups()
-        fonts['f'+font_id] = font_name
+        fonts['f'+font_id] = rtf_tokenizer.decode_text(font_name)
     return fonts
 
 # Function to extract page breaks in the RTF File
@@ -94,19 +202,18 @@ def extract_colour_table(rtf_content):
     '''
     This function extracts the colour table
     '''
-    colour_pattern = re.compile(RE_expressions['colour pattern'])
     colours = {}
     i = 1
-    for match in colour_pattern.finditer(rtf_content):
+    for match in configuration.get_pattern('colour pattern').finditer(rtf_content):
         colours['cf'+str(i)] = tuple(int(i) for i in match.groups())
         i += 1
     return colours
 
-def extract_font(style):
+def extract_font(style, context):
     '''
     This function is used to extract the font of a particular segment
     '''
-    return json_dictionary['fonts'][style.groups()[0]]
+    return context.json_dictionary['fonts'][style.groups()[0]]
 
 def extract_size(style):
     '''
@@ -114,17 +221,17 @@ def extract_size(style):
     '''
     return int(style.groups()[1][2:])
 
-def extract_colour(style):
+def extract_colour(style, context):
     '''
     This function is used to extract the colour of a particular segment
     '''
-    return json_dictionary['colours'][style.groups()[2]]
+    return context.json_dictionary['colours'][style.groups()[2]]
 
 def check_bold(row_content):
     '''
     This function is used to check whether a particular segment is bold 
     '''
-    if RTF_Style_Tags["bold"] in row_content:
+    if config_section("RTF STYLE TAGS")["bold"] in row_content:
         return "YES"
     else:
         return ""
@@ -133,7 +240,7 @@ def check_italic(row_content):
     '''
     This function is used to check whether a particular segment is italic 
     '''
-    if RTF_Style_Tags["italic"] in row_content:
+    if config_section("RTF STYLE TAGS")["italic"] in row_content:
         return "YES"
     else:
         return ""
@@ -142,14 +249,14 @@ def check_underline(row_content):
     '''
     This function is used to check whether a particular segment is underlined 
     '''
-    if RTF_Style_Tags["underline"] in row_content:
+    if config_section("RTF STYLE TAGS")["underline"] in row_content:
         return "YES"
 
 def check_superscript(row_content):
     '''
     This function is used to check whether a particular segment is superscript 
     '''
-    if RTF_Style_Tags["superscript"] in row_content:
+    if config_section("RTF STYLE TAGS")["superscript"] in row_content:
         return "YES"
     else:
         return ""
@@ -158,223 +265,277 @@ def check_subscript(row_content):
     '''
     This function is used to check whether a particular segment is subscript 
     '''
-    if RTF_Style_Tags["subscript"] in row_content:
+    if config_section("RTF STYLE TAGS")["subscript"] in row_content:
         return "YES"
     else:
         return ""
 
 
-def extract_style_details(row_content):
+def intern_style(style_info, context):
     '''
-    This function is used to extract the style details of a particular segment
+    This function adds a style to the style table of the file, unless it is already there
+    Returns the id of the style
+    '''
+    key = tuple(style_info.items())
+    style_id = context.style_ids.get(key)
+    if style_id is None:
+        style_id = f"s{len(context.style_table) + 1}"
+        context.style_ids[key] = style_id
+        context.style_table[style_id] = style_info
+    return style_id
+
+def extract_style_details(row_content, context):
     '''
-    global STYLE_LEVEL
-    if STYLE_LEVEL == "ALL":
-        style = re.search(RE_expressions['styles'],row_content)
+    This function is used to extract the style details of a particular segment
+    The style only depends on the control words of the segment, so the segment is
+    looked up with the text of its cells taken out, and each distinct segment
+    is only worked out once
+    The style is kept in the style table of the file, and its id is returned
+    '''
+    if context.style_level == "ALL":
+        segment = rtf_tokenizer.CELL_TEXT_PATTERN.sub(r"{\\cell}", row_content)
+        style_id = context.segment_styles.get(segment)
+        if style_id is not None:
+            return style_id
+        style = configuration.get_pattern('styles').search(segment)
         style_info = {}
-        style_info['font'] = extract_font(style)
+        style_info['font'] = extract_font(style, context)
         style_info['size'] = extract_size(style)
-        style_info['colour'] = extract_colour(style)
-        style_info['bold'] = check_bold(row_content)
-        style_info['italic'] = check_italic(row_content)
-        style_info['underline'] = check_underline(row_content)
-        style_info['subscript'] = check_subscript(row_content)
-        style_info['superscript'] = check_superscript(row_content)
-            
-        return style_info
-
-def special_characters(rtf_content):
-    '''
-    This function handles special characters
-    '''
-    pattern = r"\\u(\d+)"
-    def replace_unicode(match):
-        unicode_number = int(match.group(1))
-        return chr(unicode_number)
-    rtf_content = re.sub(pattern, replace_unicode, rtf_content)
-    return rtf_content
+        style_info['colour'] = extract_colour(style, context)
+        style_info['bold'] = check_bold(segment)
+        style_info['italic'] = check_italic(segment)
+        style_info['underline'] = check_underline(segment)
+        style_info['subscript'] = check_subscript(segment)
+        style_info['superscript'] = check_superscript(segment)
+
+        style_id = intern_style(style_info, context)
+        context.segment_styles[segment] = style_id
+        return style_id
 
-def extract_page_breaks(rtf_content):
-    '''This function finds the page breaks using '\\endnhere' RTF tag
-    This function is used to split and extract the RTF content for each page
+def row_content(page_layout, row):
     '''
-    page_breaks = []
-    for p in re.finditer(r"\\endnhere", rtf_content):   # Using the '\endhere' tag to find page breaks
-        page_breaks.append(p.start())
-    page_breaks.append(len(rtf_content))
-    return page_breaks
+    This function gives the RTF content of a row, used to extract its style details
+    '''
+    return page_layout.source[row.start:row.end]
 
+def count_header_rows(page_layout):
+    '''
+    This function counts the rows marked by the '\\trhdr' RTF tag at the top of the page
+    The last of these rows holds the column headers, and the rows before it hold the titles
+    '''
+    count = 0
+    for row in page_layout.rows:
+        if not row.is_header:
+            break
+        count += 1
+    return count
 
 # Function to extract the page header
-def extract_header(page_content):
-    '''This function extracts the page header using the '\\header' RTF tag
-    The content enclosed within the '\\header' tag, is found,
-    and the data is extracted using an re expression
+def extract_header(page_layout, context):
+    '''This function extracts the page header from the '\\header' RTF group
+    The rows of the group are found by the tokenizer,
+    and each header cell is stored with its alignment
     '''
-    global PAGE
-    PAGE += 1
-    try:
-        header_start = re.search(r'{\\header' , page_content).start()
-        # Finding the '\header' tag to find the header
-        i = header_start+1
-        flag = 0
-        header_end = 0
-        
-        # This while loop is used to find the header content in the page
-        # It parses through the data to find the'}'symbol
-        while i < len(page_content):
-            if page_content[i] == '{' :
-                flag += 1
-            if page_content[i] == '}' :
-                if flag == 0 :
-                    header_end = i
-                    break
-                flag -= 1
-            i += 1
-
-        styles = extract_style_details(page_content[header_start:header_end])
-        header = re.findall(RE_expressions['header'] , page_content[header_start : header_end])
-        headerstyle = re.findall(RE_expressions['headerstyle']
-                                ,page_content[header_start : header_end])
-        # Dict to store the header content with the alignment
-        headers_and_styles = {}
-        headers_and_styles['style'] = styles
-        headers = {}
-        for h, header_line in enumerate(header):
-            header_line = header_line.replace(
-                '{\\field{\\*\\fldinst { PAGE }}}{',str(PAGE)).replace(
-                    '}{\\field{\\*\\fldinst { NUMPAGES }}}',str(NUMPAGES))
-            headers[header_line]=headerstyle[h][0]
-        debug_print("Header extracted successfully")
-        headers_and_styles['data'] = headers
-
-    # Used to check whether the header content is extracted successfully
-    except AttributeError:
+    headers_and_styles = {}
+    if page_layout.header_start is None:
         debug_print("Header not found")
-        logging.write_exceptions("Header not extracted successfully in page " + str(PAGE))
-    return headers_and_styles, page_content[header_end+1:]
+        logging.write_exceptions("Header not extracted successfully in page " + str(context.page),
+                                 file=context.file, page=context.page, stage="extract_header")
+        headers_and_styles['style'] = None
+        headers_and_styles['data'] = {}
+        return headers_and_styles
+
+    header_end = page_layout.header_end or page_layout.end
+    styles = extract_style_details(page_layout.source[page_layout.header_start:header_end], context)
+    headers_and_styles['style'] = styles
+    # Dict to store the header content with the alignment
+    headers = {}
+    for row in page_layout.header_rows:
+        alignments = rtf_tokenizer.cell_alignments(page_layout.source, row)
+        for header_line, alignment in zip(row.cells, alignments):
+            if header_line:
+                headers[header_line] = alignment
+    debug_print("Header extracted successfully")
+    headers_and_styles['data'] = headers
+    return headers_and_styles
 
 # Function to extract the table title
-def extract_title(page_content):
-    '''This function is used to extract the table title using the '\\trhdr' RTF tag
-    The '\\row' tag is used to find the end of the title rows
-    Re expressions are used to extract the titles data
+def extract_title(page_layout, context):
+    '''This function is used to extract the table title from the rows marked by the '\\trhdr' RTF tag
+    The first cell of each of these rows, except the column headers row, is a title line
     '''
-
-    try:
-        trhdr = []
-        end_row = []
-        for t in re.finditer(r'\\trhdr' , page_content) :
-            trhdr.append(t.start())
-        for e in re.finditer(r'{\\row}' , page_content) :
-            end_row.append(e.end())
-        title = []
-        styles = extract_style_details(page_content[trhdr[0]:end_row[0]])
-        titles_and_styles = {}
-        titles_and_styles['style'] = styles
-        for i in range(len(trhdr)-1):
-            title_line=re.search(r'{(.+)\\cell}',page_content[trhdr[i]:end_row[i]]).group()[1:-6]
-            if title_line == "":
-                title.append(f"blank{i}")
-                continue
-            title_line=re.sub(r"\\(\w+)","",title_line).strip()
-            title.append(title_line)
-        titles_and_styles['data'] = title
-        debug_print("Title extracted successfully")
-        if len(trhdr)>1:
-            return titles_and_styles, page_content[end_row[len(trhdr)-2]+1:]
-        return titles_and_styles, page_content[trhdr[0]:]
-
-    # Used to check whether the table title is extracted successfully
-    except AttributeError:
+    header_rows = count_header_rows(page_layout)
+    titles_and_styles = {}
+    if header_rows == 0:
         debug_print("No title found")
-        logging.write_exceptions("Title not extracted successfully in page " + str(PAGE))
+        logging.write_exceptions("Title not extracted successfully in page " + str(context.page),
+                                 file=context.file, page=context.page, stage="extract_title")
+        titles_and_styles['style'] = None
+        titles_and_styles['data'] = []
+        return titles_and_styles
+
+    title = []
+    styles = extract_style_details(row_content(page_layout, page_layout.rows[0]), context)
+    titles_and_styles['style'] = styles
+    for i, row in enumerate(page_layout.rows[:header_rows-1]):
+        title_line = row.cells[0] if row.cells else ""
+        if title_line == "":
+            title.append(f"blank{i}")
+            continue
+        title.append(title_line)
+    titles_and_styles['data'] = title
+    debug_print("Title extracted successfully")
+    return titles_and_styles
 
 # Function to extract the table column headers
-def extract_column_headers(page_content):
+def extract_column_headers(page_layout, context):
     '''This function extracts the column headers
-    The '\\row' tag is used to find the end of the column headers row
+    The column headers are the cells of the last row marked by the '\\trhdr' RTF tag
     '''
-    try:
-        end_row = re.search(r'{\\row}', page_content).end()
-        styles = extract_style_details(page_content[:end_row])
-        column_headers_and_styles = {}
-        column_headers_and_styles['style'] = styles
-        headers = re.findall(r'{(.+)\\cell}' , page_content[:end_row])
-        # column_headers = list(filter(None,[re.sub(r"\\(\w+)", "", h).strip() for h in headers]))
-        column_headers = list([re.sub(r"\\(\w+)", "", h).strip() for h in headers])
-        column_headers_and_styles['data'] = column_headers
-        debug_print("Column headers extracted successfully")
-
-    # Used to check whether the column headers are extracted successfully
-    except AttributeError:
+    column_headers_and_styles = {}
+    if not page_layout.rows:
         debug_print("Column headers not found")
-        logging.write_exceptions("Column headers not extracted successfully in page " + str(PAGE))
-        column_headers = []
-    return column_headers_and_styles, page_content[end_row+1:]
+        logging.write_exceptions("Column headers not extracted successfully in page " + str(context.page),
+                                 file=context.file, page=context.page,
+                                 stage="extract_column_headers")
+        column_headers_and_styles['style'] = None
+        column_headers_and_styles['data'] = []
+        return column_headers_and_styles
+
+    row = page_layout.rows[max(count_header_rows(page_layout) - 1, 0)]
+    styles = extract_style_details(row_content(page_layout, row), context)
+    column_headers_and_styles['style'] = styles
+    column_headers_and_styles['data'] = list(row.cells)
+    debug_print("Column headers extracted successfully")
+    return column_headers_and_styles
+
+# Numbers, and count and percentage pairs such as "10 (12.5%)",
+# in the cells of the columnar table data
+INTEGER_PATTERN = re.compile(r"[-+]?\d+")
+FLOAT_PATTERN = re.compile(r"[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?")
+COUNT_PERCENT_PATTERN = re.compile(r"(\d+)\s*\(\s*([-+]?(?:\d+\.\d*|\.\d+|\d+))\s*%\s*\)")
+
+def count_percent(cell):
+    '''
+    This function gives a count and percentage cell as the count and the percentage
+    '''
+    match = COUNT_PERCENT_PATTERN.fullmatch(cell)
+    return [int(match.group(1)), float(match.group(2))]
+
+# Types of the columns of the columnar table data, by their pattern,
+# in the order they are tried
+COLUMN_TYPES = [(INTEGER_PATTERN, int), (FLOAT_PATTERN, float),
+                (COUNT_PERCENT_PATTERN, count_percent)]
+
+def column_type(cells):
+    '''
+    This function infers the type of a column of the table data once, from all its cells
+    A column is int when every cell that is not blank is a whole number, float when every
+    one is a number, and a count and percentage pair when every one is like "10 (12.5%)"
+    Returns the function giving the value of a cell, or None when the cells are kept as text
+    '''
+    filled = [cell for cell in cells if cell]
+    if not filled:
+        return None
+    for pattern, value in COLUMN_TYPES:
+        if all(map(pattern.fullmatch, filled)):
+            return value
+    return None
+
+def typed_column(cells):
+    '''
+    This function gives the values of a column of the columnar table data
+    The cells are converted to the type of the column, and blank cells become None
+    '''
+    value = column_type(cells)
+    if value is None:
+        return [cell if cell else None for cell in cells]
+    return [value(cell) if cell else None for cell in cells]
+
+def table_columns(rows, column_headers):
+    '''
+    This function gives the table data as the column headers,
+    with the values of each column in a list of their own
+    The rows are turned into columns in one pass, and the type of each column
+    is inferred from all its cells
+    Rows that are shorter than the column headers are filled with None
+    '''
+    width = len(column_headers)
+    for row in rows:
+        if len(row) > width:
+            raise IndexError(f"Row has {len(row)} cells for {width} columns")
+    if not rows:
+        return {'columns': list(column_headers), 'values': [[] for _ in column_headers]}
+    rows = [row if len(row) == width else list(row) + [None] * (width - len(row))
+            for row in rows]
+    return {'columns': list(column_headers),
+            'values': [typed_column(cells) for cells in zip(*rows)]}
 
 # Function to extract the table data
-def extract_table_data(page_content, column_headers):
+def extract_table_data(page_layout, column_headers, context):
     '''This function is used to extract the table data
-    The '\\trowd' tag is used to find the beginning of each row
-    The '\\row' tag is used to find the end of each row
+    The table rows are the rows that follow the column headers row
     The data in each row is extracted, and mapped to the column headers in a dictionary
     The presence of footnotes in the page is checked using the '\\keepn' tag
+    With the "columns" table layout, the values of each column are given in a list instead
     '''
-    try:
-        trowd = []
-        end_row = []
-        for t in re.finditer(r'\\trowd' , page_content) :
-            trowd.append(t.start())
-        for e in re.finditer(r'{\\row}' , page_content) :
-            end_row.append(e.end())
-        subjects_and_styles = {}
-        subjects = []
-        no_of_rows = len(trowd)
-        style = extract_style_details(page_content[trowd[0]:end_row[0]])
-        subjects_and_styles['style'] = style
-        if re.search(r'\\keepn', page_content[trowd[-1]:end_row[-1]]):
-            no_of_rows -= 1
-        for r in range(no_of_rows):
-            row_data = re.findall(r'{(.*)\\cell}' , page_content[trowd[r]:end_row[r]])
-            row_data = list([re.sub(r"\\\w+" , "" , rd).strip() for rd in row_data])
-            print(row_data)
-            if row_data and len(row_data)!=1:
-                subject_details = {}
-                for i, row_data_values in enumerate(row_data) :
-                    if not row_data_values.isdigit():
-                        subject_details[column_headers[i]] = row_data_values
-                    else:
-                        subject_details[column_headers[i]] = int(row_data_values)
-
-                subjects.append(subject_details)
-        subjects_and_styles['data'] = subjects
-        debug_print(
-            "Table data extracted successfully")
-    # Used to check whether the table data is extracted successfully
-    except AttributeError:
+    subjects_and_styles = {}
+    subjects = []
+    rows = page_layout.rows[max(count_header_rows(page_layout), 1):]
+    if not rows:
         debug_print("Table data not found")
-        logging.write_exceptions("Table data not extracted successfully in page " + str(PAGE))
-        subjects = []
-    return subjects_and_styles, page_content[end_row[r]:]
+        logging.write_exceptions("Table data not extracted successfully in page " + str(context.page),
+                                 file=context.file, page=context.page,
+                                 stage="extract_table_data")
+        subjects_and_styles['style'] = None
+        subjects_and_styles['data'] = subjects
+        return subjects_and_styles
+
+    style = extract_style_details(row_content(page_layout, rows[0]), context)
+    subjects_and_styles['style'] = style
+    if rows[-1].keep_next:
+        rows = rows[:-1]
+    if context.table_layout == "columns":
+        table_rows = [row.cells for row in rows if row.cells and len(row.cells) != 1]
+        subjects_and_styles['data'] = table_columns(table_rows, column_headers)
+        debug_print("Table data extracted successfully")
+        return subjects_and_styles
+    for row in rows:
+        row_data = row.cells
+        if row_data and len(row_data)!=1:
+            subject_details = {}
+            for i, row_data_values in enumerate(row_data) :
+                if not row_data_values.isdigit():
+                    subject_details[column_headers[i]] = row_data_values
+                else:
+                    subject_details[column_headers[i]] = int(row_data_values)
+
+            subjects.append(subject_details)
+    subjects_and_styles['data'] = subjects
+    debug_print(f"Table data extracted successfully, {len(subjects)} rows")
+    return subjects_and_styles
 
 # Function to extract the table footnotes
-def extract_footnotes(page_content):
-    '''This function is used to extract the footnotes using an re expression'''
-    try:
-        footnotes = [re.search(r'{(.+)\\cell}', page_content).group()[1:-6]]
+def extract_footnotes(page_layout, context):
+    '''This function is used to extract the footnotes
+    The footnotes are held in the last row of the page, marked by the '\\keepn' tag
+    '''
+    rows = page_layout.rows[max(count_header_rows(page_layout), 1):]
+    if rows and rows[-1].keep_next and rows[-1].cells:
+        footnotes = [rows[-1].cells[0]]
         debug_print(f"Footer found: {footnotes}")
         debug_print("Footnotes extracted successfully")
     # Used to check whether the footnotes are extracted successfully
-    except AttributeError:
+    else:
         debug_print("Footnotes not found")
-        message = "Footnotes not extracted successfully in page " + str(PAGE)
-        logging.write_exceptions(message + "\n")
+        message = "Footnotes not extracted successfully in page " + str(context.page)
+        logging.write_exceptions(message + "\n", file=context.file, page=context.page,
+                                 stage="extract_footnotes")
         footnotes = []
     return footnotes
 
 # Function to extract the table footer
-def extract_footer(footnotes):
+def extract_footer(footnotes, context):
     '''This function is used to find the table footer
     Is found by searching for 'Source'/'Dataset'
     The table footers are then extracted
@@ -392,77 +553,273 @@ def extract_footer(footnotes):
     # Used to check whether the footer is extracted successfully
     except AttributeError:
         debug_print("Footer not found")
-        logging.write_exceptions("Footer not extracted successfully in page " + str(PAGE))
+        logging.write_exceptions("Footer not extracted successfully in page " + str(context.page),
+                                 file=context.file, page=context.page, stage="extract_footer")
 
 # Function to extract the contents of a page
-def extract_page_content(page_content):
+def extract_page_content(page_layout, context):
     '''
     This function is used to extract the content of each page
     A dictionary called 'page_details' is initialized
     The respective functions to extract the page header, table title,
     column headers, subjects details, footnotes and footers are called
+    on the page layout built by the tokenizer
+    Each function is run as a stage, which is recorded when the conversion is traced
     '''
+    context.page = page_layout.number
+    stage = context.tracer.stage if context.tracer is not None else tracing.untraced_stage
     page_details = {}
-    page_details['header'], page_content = extract_header(page_content)
-    page_details['title'], page_content = extract_title(page_content)
-    page_details['column headers'], page_content = extract_column_headers(page_content)
-    page_details['subjects'], page_content = (
-    extract_table_data(page_content, page_details['column headers']['data'])
-    )
-    page_details['footnotes'] = extract_footnotes(page_content)
-    page_details['footnotes'], page_details['footer'] = (
-    extract_footer(page_details['footnotes'])
-    )
+    page_details['header'] = stage("extract_header", page_layout,
+                                   extract_header, page_layout, context)
+    page_details['title'] = stage("extract_title", page_layout,
+                                  extract_title, page_layout, context)
+    page_details['column headers'] = stage("extract_column_headers", page_layout,
+                                           extract_column_headers, page_layout, context)
+    page_details['subjects'] = stage("extract_table_data", page_layout, extract_table_data,
+                                     page_layout, page_details['column headers']['data'], context)
+    page_details['footnotes'] = stage("extract_footnotes", page_layout,
+                                      extract_footnotes, page_layout, context)
+    page_details['footnotes'], page_details['footer'] = stage(
+        "extract_footer", page_layout, extract_footer, page_details['footnotes'], context)
 
     return page_details
 
+def index_document(rtf_content, context):
+    '''
+    This function reads the font and colour tables, found before the first page,
+    into the JSON dictionary, and indexes the pages of the RTF content
+    Returns the span of each page
+    '''
+    page_index = rtf_tokenizer.index_pages(rtf_content)
+    first_page = page_index[0].start if page_index else len(rtf_content)
+    fonts = extract_font_details(rtf_content[:first_page])
+    colours = extract_colour_table(rtf_content[:first_page])
+    context.unicode_fallback = rtf_tokenizer.unicode_fallback(rtf_content, 0, first_page)
+    debug_print(f"Fonts extracted: {fonts}")
+
+    json_dictionary = context.json_dictionary
+    json_dictionary ['fonts'] = fonts
+    json_dictionary ['colours'] = colours
+
+    context.page = 0
+    context.numpages = len(page_index)
+    debug_print(f"Pages found: {context.numpages}")
+    return page_index
+
+def read_chunks(raw_content, chunk_size=CHUNK_SIZE):
+    '''
+    This function gives the raw bytes of the RTF file in chunks
+    The raw bytes are given by a file opened in binary mode, or by a bytes-like object
+    such as the file mapped into memory
+    '''
+    if hasattr(raw_content, "readinto"):
+        raw_content.seek(0)
+        return iter(lambda: raw_content.read(chunk_size), b"")
+    return (raw_content[position:position + chunk_size]
+            for position in range(0, len(raw_content), chunk_size))
+
+def count_pages(raw_content):
+    '''
+    This function counts the pages of the raw bytes of the RTF file, chunk by chunk
+    The end of each chunk is kept with the next one, so that a page break tag
+    split across two chunks is counted once
+    '''
+    tag = PAGE_BREAK_TAG.encode("utf-8")
+    count = 0
+    tail = b""
+    for chunk in read_chunks(raw_content):
+        chunk = tail + chunk
+        count += chunk.count(tag)
+        tail = chunk[-(len(tag) - 1):]
+    return count
+
+def page_texts(raw_content):
+    '''
+    This function yields the text before the first page, and then the text of each page,
+    decoded from the raw bytes of the RTF file as they are read in chunks
+    A page is given as soon as the page break tag of the next page is found,
+    so only about one page of text is held at a time, whatever the size of the file
+    '''
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tag = PAGE_BREAK_TAG
+    buffer = ""
+    searched = 1
+    for chunk in read_chunks(raw_content):
+        buffer += decoder.decode(chunk)
+        start = 0
+        position = buffer.find(tag, searched)
+        while position != -1:
+            yield buffer[start:position]
+            start = position
+            position = buffer.find(tag, start + 1)
+        buffer = buffer[start:]
+        # A tag may be split across this chunk and the next one
+        searched = max(len(buffer) - len(tag) + 1, 1)
+    yield buffer + decoder.decode(b"", final=True)
+
+def index_stream(raw_content, context):
+    '''
+    This function reads the font and colour tables, found before the first page,
+    into the JSON dictionary, and counts the pages of the raw bytes of the RTF file
+    Returns the text of each page in turn, read from the raw bytes when it is needed
+    '''
+    context.page = 0
+    context.numpages = count_pages(raw_content)
+    texts = page_texts(raw_content)
+    preamble = normalise_text(next(texts))
+    fonts = extract_font_details(preamble)
+    colours = extract_colour_table(preamble)
+    context.unicode_fallback = rtf_tokenizer.unicode_fallback(preamble)
+    debug_print(f"Fonts extracted: {fonts}")
+
+    json_dictionary = context.json_dictionary
+    json_dictionary ['fonts'] = fonts
+    json_dictionary ['colours'] = colours
+    debug_print(f"Pages found: {context.numpages}")
+    return texts
+
+def stream_layouts(texts, context):
+    '''
+    This function yields the layout of each page, parsing the text of one page at a time
+    '''
+    for page_number, text in enumerate(texts):
+        yield from rtf_tokenizer.parse_pages(normalise_text(text), context.numpages,
+                                             page_number=page_number,
+                                             fallback=context.unicode_fallback)
+
+def stream_contents(texts, context):
+    '''
+    This function yields the content of each page of the streamed text in turn
+    '''
+    page_layouts = stream_layouts(texts, context)
+    if context.tracer is not None:
+        page_layouts = context.tracer.trace_pages(page_layouts)
+    for page_layout in page_layouts:
+        debug_print(f"Processing page {page_layout.number}")
+        yield extract_page_content(page_layout, context)
+
+def iter_pages(path, context=None):
+    '''
+    This function yields the content of each page of an RTF file, one page at a time
+    The file is read in chunks and each page is parsed as soon as it is complete,
+    so the memory used stays at about one page, whatever the size of the file
+    The font and colour tables are read into the JSON dictionary of the context
+    before the first page is given
+    '''
+    if context is None:
+        context = ConversionContext()
+    context.file = path
+    with open(path, 'rb') as rtf_file:
+        yield from stream_contents(index_stream(rtf_file, context), context)
+
+def write_rtf(raw_content, item, output_directory, json_conversion, context):
+    '''
+    This function writes the output of the RTF file, streaming its pages from the raw bytes
+    '''
+    file_stage = (context.tracer.file_stage if context.tracer is not None
+                  else tracing.untraced_file_stage)
+    size = os.path.getsize(item)
+    texts = file_stage("index_document", size, index_stream, raw_content, context)
+    debug_print(f"RTF content loaded for file {item}")
+
+    # The pages are extracted while the output is written, so the writer
+    # can emit each page as soon as it is ready
+    json_dictionary = context.json_dictionary
+    json_dictionary ['data'] = stream_contents(texts, context)
+    # The style table is filled in as the pages are extracted,
+    # so it is written after them
+    if context.style_level == "ALL":
+        json_dictionary ['styles'] = context.style_table
+
+    return file_stage("write_output", size, json_conversion,
+                      json_dictionary, item, output_directory, logging.write_success)
+
 # Function to convert an rtf file to json
-def convert_rtf(item, file_no, output_directory, json_conversion):
+def convert_rtf(item, file_no, output_directory, json_conversion, context=None,
+                raw_content=None):
     '''
     This function is used to convert the RTF file into JSON format
-    The page breaks function is called to split the content for each page
-    '''
+    The pages are streamed from the raw bytes, and each page is walked once by
+    the tokenizer, which gives its layout, so about one page is held in memory at a time
+    A new conversion context is used unless one is given
+    The raw bytes of the file are read from the file in chunks unless they are given
+    '''
+    if context is None:
+        context = ConversionContext()
+    context.file = item
     debug_print(f"Converting file {file_no}: {item}")
     try:
-      # Extract rtf content as a string in python
-        with open(item, 'r', encoding = "utf-8") as file:
-            rtf_content = file.read().replace("{\\line}\n", " ").replace("\\~", " ").replace("\\page", " ")
-            debug_print(f"RTF content loaded for file {file_no}")
-        
-        rtf_content = special_characters(rtf_content)
-
-        fonts = extract_font_details(rtf_content)
-        colours = extract_colour_table(rtf_content)
-        debug_print(f"Fonts extracted: {fonts}")
-        
-        json_dictionary = {}
-        data = []
-        json_dictionary ['fonts'] = fonts
-        json_dictionary ['colours'] = colours
-        json_dictionary ['data'] = data
-
-        page_breaks = extract_page_breaks(rtf_content)
-        debug_print(f"Page breaks found: {page_breaks}")
-
-        PAGE = 0
-        NUMPAGES = rtf_content.count("NUMPAGES")
-        for i in range(len(page_breaks)-1) :
-
-            page_content = rtf_content[page_breaks[i] : page_breaks[i+1]]
-            debug_print(f"Processing page {PAGE + 1}")
-            page_details = extract_page_content(page_content)
-            data.append(page_details)
-        
-        return json_conversion(json_dictionary, item, output_directory, logging.write_success)
+        if raw_content is None:
+            with open(item, 'rb') as rtf_file:
+                return write_rtf(rtf_file, item, output_directory, json_conversion, context)
+        return write_rtf(raw_content, item, output_directory, json_conversion, context)
 
     except Exception as e:
         debug_print("Error, cannot be converted due to " + str(e))
         logging.write_exceptions(datetime.now().isoformat() + "\n" + item +
-                                 " cannot be converted due to " + str(e) + "\n")
+                                 " cannot be converted due to " + str(e) + "\n",
+                                 file=item, page=context.page, stage="convert_rtf", error=str(e))
         return "Failed", "Not in Scope"
 
 
-def process_file(file, file_no, selected_folder, OUTPUT_DIRECTORY, json_conversion):
+def extract_pages(path, pages=None, first=None, context=None):
+    '''
+    This function extracts only the requested pages of an RTF file
+    The pages are given by their numbers, starting at 1, or as the first N pages
+    The span of each page is found by the page index, and only the requested pages
+    are parsed, so a single page of a long listing is quick to extract
+    Returns the JSON dictionary of the file with the requested pages as its data
+    '''
+    if context is None:
+        context = ConversionContext()
+    context.file = path
+    with open_rtf(path) as raw_content:
+        rtf_content = normalise_rtf(raw_content)
+    page_index = index_document(rtf_content, context)
+
+    if pages is None:
+        pages = range(1, len(page_index) + 1)
+    if first is not None:
+        pages = [page for page in pages if page <= first]
+    for page in pages:
+        if not 1 <= page <= len(page_index):
+            raise ValueError(f"Page {page} is not in {path}, which has {len(page_index)} pages")
+
+    data = []
+    for page in sorted(set(pages)):
+        span = page_index[page - 1]
+        for page_layout in rtf_tokenizer.parse_pages(rtf_content, context.numpages, span.start,
+                                                     span.end, page_number=span.number - 1,
+                                                     fallback=context.unicode_fallback):
+            data.append(extract_page_content(page_layout, context))
+    context.json_dictionary['data'] = data
+    if context.style_level == "ALL":
+        context.json_dictionary['styles'] = context.style_table
+    return context.json_dictionary
+
+
+def convert(path, style_level="None", table_layout="rows"):
+    '''
+    This function converts an RTF file and gives its JSON dictionary, without writing
+    any output file, so that the conversion can be used as a library
+    The dictionary is the one written to the JSON file of the RTF file
+    A ValueError is raised when the file does not conform to the schema
+    '''
+    with open_rtf(path) as raw_content:
+        if not check_rtf(path, raw_content):
+            raise ValueError(f"RTF File {path} does not conform to schema, cannot be converted")
+    context = ConversionContext(style_level, table_layout=table_layout)
+    context.json_dictionary['data'] = list(iter_pages(path, context))
+    if context.style_level == "ALL":
+        context.json_dictionary['styles'] = context.style_table
+    return context.json_dictionary
+
+
+def process_file(file, file_no, selected_folder, OUTPUT_DIRECTORY, json_conversion, context=None):
+    '''
+    This function is used to check and convert a single file of the selected folder
+    The conversion context of the file can be given to read its state after the conversion
+    '''
     file_path = os.path.join(selected_folder, file)
     if_inc = False
     if not file.endswith('.rtf'):
@@ -472,16 +829,22 @@ def process_file(file, file_no, selected_folder, OUTPUT_DIRECTORY, json_conversi
         debug_print("Not an RTF File, cannot be converted")
     elif os.path.isfile(file_path):
         if_inc = True
-        if check_rtf(file_path):
-            print("RTF File conforms to schema")
-            status, remarks = convert_rtf(file_path, file_no, OUTPUT_DIRECTORY, json_conversion)
+        # The file is read once, for both the schema check and the conversion
+        with open_rtf(file_path) as raw_content:
+            conforms = check_rtf(file_path, raw_content)
+            if conforms:
+                debug_print("RTF File conforms to schema")
+                status, remarks = convert_rtf(file_path, file_no, OUTPUT_DIRECTORY,
+                                              json_conversion, context, raw_content)
+        if conforms:
             color = 'green' if status == "Successful" else 'red'
             debug_print("RTF File converted successfully")
         else:
-            print(f"RTF File {file} does not conform to schema, cannot be converted")
+            debug_print(f"RTF File {file} does not conform to schema, cannot be converted")
             logging.write_exceptions(
                 f"RTF File {file} does not conform to schema, "
-                "cannot be converted\n"
+                "cannot be converted\n",
+                file=file_path, stage="check_rtf"
             )
 
             status = "Failed"
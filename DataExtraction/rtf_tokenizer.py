@@ -0,0 +1,536 @@
+'''
+This module is used to tokenize the RTF content in a single pass
+The RTF content is split into control words, control symbols, groups and text runs
+by one compiled re expression, and the page layouts are built on top of the tokens
+Every page of the document is walked exactly once
+'''
+import re
+import sys
+from collections import namedtuple
+
+# The patterns use possessive quantifiers, which re supports from Python 3.11
+if sys.version_info < (3, 11):
+    raise ImportError("The RTF tokenizer needs Python 3.11 or later, it is run with Python "
+                      f"{sys.version_info.major}.{sys.version_info.minor}")
+
+# Token kinds produced by the tokenizer
+TABLE_ROW = "row"
+CELL_GROUP = "cell"
+ROW_END = "rowend"
+FORMATTING = "run"
+CONTROL_WORD = "word"
+GROUP_START = "open"
+GROUP_END = "close"
+TEXT = "text"
+HEX_ESCAPE = "hex"
+UNICODE_ESCAPE = "unicode"
+CONTROL_SYMBOL = "symbol"
+
+# Control words that change the page layout or the cell text
+# All other control words only carry formatting, and a run of them is a single token
+LAYOUT_WORDS = ("trowd|trhdr|keepn|cell|row|endnhere|field|fldinst|fldrslt|"
+                "header[lrf]?|footer[lrf]?|fonttbl|colortbl|stylesheet|info|pict|"
+                "listtable|listoverridetable|rsidtbl|generator|xmlnstbl|themedata|datastore|"
+                "line|par|tab|emdash|endash|lquote|rquote|ldblquote|rdblquote|bullet")
+
+# Control words that end a table row, a cell paragraph or a page
+BOUNDARY_WORDS = "trowd|cell|row|endnhere|field|header[lrf]?|footer[lrf]?"
+BOUNDARY_CHECK = r"""\\(?!(?:""" + BOUNDARY_WORDS + r""")(?![a-zA-Z]))"""
+# The '\uN' and '\ucN' escapes are character escapes, not formatting words
+ESCAPE_CHECK = r"""(?!uc?-?\d)"""
+FORMATTING_WORD = BOUNDARY_CHECK + ESCAPE_CHECK + r"""[a-zA-Z]+(?:-?\d+)?[ ]?"""
+# Text of a cell: plain text and the '\'hh', '\uN' and '\ucN' character escapes
+CELL_TEXT = r"""[^\\{}\r\n]*+(?:(?:\\'[0-9a-fA-F]{2}|\\uc?-?\d+[ ]?)[^\\{}\r\n]*+)*+"""
+PLAIN_CELL = r"""\{""" + CELL_TEXT + r"""\\cell\}"""
+
+# Each alternative is wrapped in an outer named group, so 'lastgroup' gives the token kind
+# A table row whose cells hold only plain text, a cell paragraph whose group holds
+# only plain text and the '\cell' tag, and the '{\row}' group are single tokens
+# Line endings do not match any alternative, so they are skipped as RTF requires
+TOKEN_PATTERN = re.compile(r"""
+    (?P<row>\\trowd(?![a-zA-Z])
+            (?P<rowbody>[^{\\]*+(?:(?:""" + BOUNDARY_CHECK + r"""|""" + PLAIN_CELL + r""")[^{\\]*+)*+)
+            \{\\row\})
+  | (?P<cell>(?P<cellformat>(?:""" + FORMATTING_WORD + r"""|[\r\n])*+)
+             \{(?P<celltext>""" + CELL_TEXT + r""")\\cell\})
+  | (?P<rowend>\{\\row\})
+  | (?P<unicode>\\uc?-?\d+[ ]?)
+  | (?P<run>(?:\\(?!(?:""" + LAYOUT_WORDS + r""")(?![a-zA-Z]))""" + ESCAPE_CHECK
+                + r"""[a-zA-Z]+(?:-?\d+)?[ ]?)++)
+  | (?P<word>\\(?P<name>""" + LAYOUT_WORDS + r""")(?![a-zA-Z])(?P<param>-?\d+)?[ ]?)
+  | (?P<open>\{)
+  | (?P<close>\})
+  | (?P<text>[^\\{}\r\n]++)
+  | (?P<hex>\\'(?P<hexvalue>[0-9a-fA-F]{2}))
+  | (?P<symbol>\\(?P<char>.))
+""", re.VERBOSE | re.DOTALL)
+CELL_TEXT_PATTERN = re.compile(r"\{(" + CELL_TEXT + r")\\cell\}")
+# Group braces, and the escaped braces and backslashes that are not group braces
+BRACE_PATTERN = re.compile(r"\\[\\{}]|[{}]")
+# Group braces and the '\ucN' escapes, which are scoped to their group
+FALLBACK_PATTERN = re.compile(r"\\[\\{}]|[{}]|\\uc(-?\d+)")
+ESCAPE_PATTERN = re.compile(r"\\(?:u(-?\d+)[ ]?|uc(\d+)[ ]?|'([0-9a-fA-F]{2}))")
+ALIGNMENT_PATTERN = re.compile(r"\\q([lcrj])(?![a-zA-Z])|(\\cell)(?![a-zA-Z])")
+
+Token = namedtuple("Token", ["kind", "value", "param", "start", "end"])
+
+# Layout of a table row: the text of each cell,
+# the row flags and the offsets of the row in the RTF content
+# Span of a page in the RTF content, from its page break tag to the next one
+PageSpan = namedtuple("PageSpan", ["number", "start", "end"])
+
+Row = namedtuple("Row", ["cells", "is_header", "keep_next", "start", "end"])
+
+# Layout of a page: the page header rows, the body rows and the offsets of the page
+PageLayout = namedtuple("PageLayout", ["number", "start", "end", "header_start", "header_end",
+                                       "header_rows", "rows", "source"])
+
+# Destinations whose content is never part of the page text
+SKIPPED_DESTINATIONS = {"fonttbl", "colortbl", "stylesheet", "info", "pict", "footer",
+                        "footerl", "footerr", "footerf", "listtable", "listoverridetable",
+                        "rsidtbl", "generator", "xmlnstbl", "themedata", "datastore"}
+HEADER_DESTINATIONS = {"header", "headerl", "headerr", "headerf"}
+
+# Text produced by control words and control symbols inside a cell
+# Line, paragraph and tab breaks become spaces, so the words they separate are kept apart
+WORD_TEXT = {"line": " ", "par": " ", "tab": " ", "emdash": "—", "endash": "–",
+             "lquote": "‘", "rquote": "’", "ldblquote": "“",
+             "rdblquote": "”", "bullet": "•"}
+SYMBOL_TEXT = {"\\": "\\", "{": "{", "}": "}", "~": " ", "_": "-"}
+
+def hex_table():
+    '''
+    This function gives the character of each '\\'hh' escape, by its two hex digits
+    in lower or upper case, in the Windows-1252 code page of the RTF files
+    The bytes that are not used by Windows-1252 are read as Latin-1
+    '''
+    table = {}
+    for byte in range(256):
+        try:
+            character = bytes([byte]).decode("cp1252")
+        except UnicodeDecodeError:
+            character = chr(byte)
+        high, low = f"{byte:02x}"
+        for digits in (high + low, high.upper() + low, high + low.upper(),
+                       high.upper() + low.upper()):
+            table[digits] = character
+    return table
+
+HEX_TEXT = hex_table()
+
+# Number of fallback characters that follow a '\uN' escape, unless set by '\ucN'
+UNICODE_FALLBACK = 1
+
+# Destination states of a group
+NORMAL = 0
+SKIP = 1
+HEADER = 2
+FIELD_INSTRUCTION = 3
+
+
+def tokenize(rtf_content, start=0, end=None):
+    '''
+    This function walks the RTF content once and yields its tokens
+    Layout control words are yielded with their name and numeric parameter,
+    plain table rows with the text of their cells, plain cell paragraphs with the cell text,
+    and all other tokens with their text
+    '''
+    if end is None:
+        end = len(rtf_content)
+    for match in TOKEN_PATTERN.finditer(rtf_content, start, end):
+        kind = match.lastgroup
+        if kind == CONTROL_WORD:
+            param = match.group("param")
+            yield Token(kind, match.group("name"),
+                        int(param) if param is not None else None,
+                        match.start(), match.end())
+        elif kind == TABLE_ROW:
+            yield Token(kind, CELL_TEXT_PATTERN.findall(match.group("rowbody")), None,
+                        match.start(), match.end())
+        elif kind == CELL_GROUP:
+            yield Token(kind, match.group("celltext"), None, match.start(), match.end())
+        elif kind == HEX_ESCAPE:
+            yield Token(kind, match.group("hexvalue"), None, match.start(), match.end())
+        elif kind == CONTROL_SYMBOL:
+            yield Token(kind, match.group("char"), None, match.start(), match.end())
+        else:
+            yield Token(kind, match.group(kind), None, match.start(), match.end())
+
+
+def field_result(instruction, page_number, numpages):
+    '''
+    This function gives the text of the PAGE and NUMPAGES fields
+    Other fields keep the text of their result group
+    '''
+    instruction = instruction.strip().upper()
+    if instruction == "PAGE":
+        return str(page_number)
+    if instruction == "NUMPAGES":
+        return str(numpages)
+    return None
+
+
+def decode_text(text, fallback=UNICODE_FALLBACK):
+    '''
+    This function decodes the '\\uN', '\\'hh' and '\\ucN' character escapes of a text
+    in a single pass, and is only given the text of the cells
+    A negative '\\uN' is the code unit plus 65536, and the characters after it are
+    its fallback for older readers, which are left out: one character, or as many
+    as the last '\\ucN' gives, where a '\\'hh' escape counts as one character
+    Surrogate pairs are joined into a single character
+    '''
+    if "\\" not in text:
+        return text
+    parts = []
+    position = 0
+    match = ESCAPE_PATTERN.search(text)
+    while match is not None:
+        parts.append(text[position:match.start()])
+        position = match.end()
+        unicode, count, hex_value = match.groups()
+        if hex_value is not None:
+            parts.append(HEX_TEXT[hex_value])
+        elif count is not None:
+            fallback = int(count)
+        else:
+            code = int(unicode)
+            parts.append(chr(code + 65536 if code < 0 else code))
+            for _ in range(fallback):
+                if text.startswith("\\'", position) and len(text) >= position + 4:
+                    position += 4
+                elif position < len(text) and text[position] not in "\\{}":
+                    position += 1
+        match = ESCAPE_PATTERN.search(text, position)
+    parts.append(text[position:])
+    text = "".join(parts)
+    if any("\ud800" <= character <= "\udfff" for character in text):
+        text = text.encode("utf-16-le", "surrogatepass").decode("utf-16-le", "replace")
+    return text
+
+
+def unicode_fallback(rtf_content, start=0, end=None, fallback=UNICODE_FALLBACK):
+    '''
+    This function gives the number of fallback characters of the '\\uN' escapes
+    in effect at the end of the RTF content, set by the last '\\ucN' of the groups
+    that are still open there
+    It is used to find the count set in the document header, before the first page
+    '''
+    if end is None:
+        end = len(rtf_content)
+    fallbacks = []
+    for match in FALLBACK_PATTERN.finditer(rtf_content, start, end):
+        brace = match.group()
+        if brace == "{":
+            fallbacks.append(fallback)
+        elif brace == "}":
+            if fallbacks:
+                fallback = fallbacks.pop()
+        elif match.group(1) is not None:
+            fallback = int(match.group(1))
+    return fallback
+
+
+def scoped_text(text, fallback):
+    '''
+    This function gives a text of a cell with the '\\ucN' in effect for its group,
+    so its '\\uN' escapes keep their fallback count when the cell text is decoded
+    '''
+    return f"\\uc{fallback} {text}"
+
+
+def group_index(rtf_content, start=0, end=None):
+    '''
+    This function finds the closing brace of every group of the RTF content in one pass
+    Escaped braces and backslashes are not taken as group braces
+    Returns the offset of the closing brace of each group by the offset of its opening brace,
+    so the extent of any group is found in constant time
+    Groups that are not closed before the end are left out
+    '''
+    if end is None:
+        end = len(rtf_content)
+    groups = {}
+    openings = []
+    for match in BRACE_PATTERN.finditer(rtf_content, start, end):
+        brace = match.group()
+        if brace == "{":
+            openings.append(match.start())
+        elif brace == "}" and openings:
+            groups[openings.pop()] = match.start()
+    return groups
+
+
+def cell_alignments(rtf_content, row):
+    '''
+    This function gives the alignment of each cell of a row
+    The alignment of a cell is the last '\\ql', '\\qc', '\\qr' or '\\qj' RTF tag before its end
+    '''
+    alignments = []
+    alignment = "l"
+    for match in ALIGNMENT_PATTERN.finditer(rtf_content, row.start, row.end):
+        if match.group(2):
+            alignments.append(alignment)
+            alignment = "l"
+        else:
+            alignment = match.group(1)
+    return alignments
+
+
+def index_pages(rtf_content, start=0, end=None, page_break="endnhere"):
+    '''
+    This function finds the span of every page with a single scan for the page break tag
+    The pages are not tokenized, so that any page can then be parsed on its own
+    by giving its span to parse_pages
+    '''
+    if end is None:
+        end = len(rtf_content)
+    tag = "\\" + page_break
+    spans = []
+    position = rtf_content.find(tag, start, end)
+    while position != -1:
+        if spans:
+            spans[-1] = spans[-1]._replace(end=position)
+        spans.append(PageSpan(len(spans) + 1, position, end))
+        position = rtf_content.find(tag, position + len(tag), end)
+    return spans
+
+def parse_pages(rtf_content, numpages, start=0, end=None, page_break="endnhere", page_number=0,
+                fallback=UNICODE_FALLBACK):
+    '''
+    This function builds the layout of every page from a single walk over the tokens
+    A new page begins at every '\\endnhere' RTF tag
+    Rows begin at the '\\trowd' tag and end at the '\\row' tag,
+    cells end at the '\\cell' tag, and header rows are marked by the '\\trhdr' tag
+    Rows inside the '\\header' group are collected as the page header
+    The layout of each page is yielded as soon as the next page begins
+    The page number is the number of pages before the start of the walk,
+    so that a single page can be parsed from its span
+    The fallback is the number of characters after each '\\uN' escape set by the '\\ucN'
+    of the document header, and each group keeps the '\\ucN' set inside it to itself
+    '''
+    if end is None:
+        end = len(rtf_content)
+
+    page_start = None
+    header_start = header_end = None
+    header_rows = []
+    rows = []
+
+    # Group state: the destination of each open group, and whether
+    # the first control word of the last opened group is still to be seen
+    destinations = [NORMAL]
+    destination = NORMAL
+    # Offset of the opening brace of each open group, and the index of the groups
+    # of the content, built when the first skipped group is found, to jump over it
+    openings = []
+    groups = None
+    # Fallback count of the '\uN' escapes of the group enclosing each open group
+    fallbacks = []
+    group_opened = False
+    ignorable = False
+    instruction = []
+    # Open fields as [group depth, whether the field result is already known]
+    fields = []
+
+    # Row state
+    in_row = False
+    row_start = 0
+    is_header = False
+    keep_next = False
+    cells = []
+    cell_text = []
+
+    position = start
+    while position is not None:
+        resume = None
+        for match in TOKEN_PATTERN.finditer(rtf_content, position, end):
+            kind = match.lastgroup
+
+            if kind == TABLE_ROW:
+                group_opened = False
+                if destination == NORMAL or destination == HEADER:
+                    row_body = match.group("rowbody")
+                    row = Row([(decode_text(cell, fallback) if "\\" in cell else cell).strip()
+                               for cell in CELL_TEXT_PATTERN.findall(row_body)],
+                              "\\trhdr" in row_body, "\\keepn" in row_body,
+                              match.start(), match.end())
+                    if destination == HEADER:
+                        header_rows.append(row)
+                    else:
+                        rows.append(row)
+                    in_row = False
+                continue
+
+            if kind == CELL_GROUP:
+                group_opened = False
+                if in_row and (destination == NORMAL or destination == HEADER):
+                    cell_format = match.group("cellformat")
+                    if cell_format:
+                        # The row flags may come just before the first cell of the row
+                        if "\\keepn" in cell_format:
+                            keep_next = True
+                        if "\\trhdr" in cell_format:
+                            is_header = True
+                    text = match.group("celltext")
+                    cell_text.append(scoped_text(text, fallback) if "\\u" in text else text)
+                    cells.append(decode_text("".join(cell_text)).strip())
+                    cell_text = []
+                continue
+
+            if kind == FORMATTING:
+                if group_opened:
+                    group_opened = False
+                    if ignorable and destination != SKIP:
+                        ignorable = False
+                        destination = SKIP
+                        destinations[-1] = destination
+                        # The content of a skipped group is jumped over
+                        if groups is None:
+                            groups = group_index(rtf_content, start, end)
+                        resume = groups.get(openings[-1])
+                        if resume is not None:
+                            break
+                    ignorable = False
+                continue
+
+            if kind == ROW_END:
+                kind = CONTROL_WORD
+                value = "row"
+                group_opened = False
+            elif kind == CONTROL_WORD:
+                value = match.group("name")
+
+            if kind == CONTROL_WORD:
+                if group_opened:
+                    # The first control word of a group decides its destination
+                    group_opened = False
+                    if destination != SKIP:
+                        if value in HEADER_DESTINATIONS and destination == NORMAL:
+                            destination = HEADER
+                            header_start = openings[-1]
+                        elif value == "fldinst" and ignorable:
+                            destination = FIELD_INSTRUCTION
+                            instruction = []
+                        elif value == "fldrslt" and fields and fields[-1][1]:
+                            destination = SKIP
+                        elif ignorable or value in SKIPPED_DESTINATIONS:
+                            destination = SKIP
+                        destinations[-1] = destination
+                        if destination == SKIP:
+                            ignorable = False
+                            if groups is None:
+                                groups = group_index(rtf_content, start, end)
+                            resume = groups.get(openings[-1])
+                            if resume is not None:
+                                break
+                    ignorable = False
+                if destination == SKIP or destination == FIELD_INSTRUCTION:
+                    continue
+
+                if value == "cell":
+                    if in_row:
+                        cells.append(decode_text("".join(cell_text)).strip())
+                        cell_text = []
+                elif value == "trowd":
+                    if not in_row or not cells:
+                        in_row = True
+                        row_start = match.start()
+                        is_header = False
+                        keep_next = False
+                        cells = []
+                        cell_text = []
+                elif value == "row":
+                    if in_row:
+                        row = Row(cells, is_header, keep_next, row_start, match.end())
+                        if destination == HEADER:
+                            header_rows.append(row)
+                        else:
+                            rows.append(row)
+                        in_row = False
+                        cells = []
+                        cell_text = []
+                elif value == "trhdr":
+                    is_header = True
+                elif value == "keepn":
+                    keep_next = True
+                elif value == page_break:
+                    if page_start is not None:
+                        yield PageLayout(page_number, page_start, match.start(),
+                                         header_start, header_end, header_rows, rows, rtf_content)
+                    page_number += 1
+                    page_start = match.start()
+                    header_start = header_end = None
+                    header_rows = []
+                    rows = []
+                    in_row = False
+                elif value == "field":
+                    fields.append([len(destinations), False])
+                elif in_row and value in WORD_TEXT:
+                    cell_text.append(WORD_TEXT[value])
+                continue
+
+            if kind == GROUP_START:
+                destinations.append(destination)
+                openings.append(match.start())
+                fallbacks.append(fallback)
+                group_opened = True
+                ignorable = False
+                continue
+
+            if kind == GROUP_END:
+                group_opened = False
+                ignorable = False
+                closed = destinations.pop() if len(destinations) > 1 else NORMAL
+                if openings:
+                    openings.pop()
+                if fallbacks:
+                    fallback = fallbacks.pop()
+                destination = destinations[-1]
+                if closed == FIELD_INSTRUCTION and destination != FIELD_INSTRUCTION:
+                    result = field_result("".join(instruction), page_number, numpages)
+                    if result is not None:
+                        if in_row and destination != SKIP:
+                            cell_text.append(result)
+                        if fields:
+                            fields[-1][1] = True
+                elif closed == HEADER and destination != HEADER:
+                    header_end = match.end()
+                while fields and fields[-1][0] > len(destinations):
+                    fields.pop()
+                continue
+
+            if kind == TEXT:
+                group_opened = False
+                if destination == NORMAL or destination == HEADER:
+                    if in_row:
+                        cell_text.append(match.group(kind))
+                elif destination == FIELD_INSTRUCTION:
+                    instruction.append(match.group(kind))
+                continue
+
+            if kind == CONTROL_SYMBOL:
+                value = match.group("char")
+                if group_opened and value == "*":
+                    ignorable = True
+                    continue
+                group_opened = False
+                if in_row and (destination == NORMAL or destination == HEADER):
+                    cell_text.append(SYMBOL_TEXT.get(value, ""))
+                continue
+
+            # Character escapes are kept as they are written in the RTF content,
+            # and decoded with the rest of the cell text
+            group_opened = False
+            if kind == UNICODE_ESCAPE:
+                escape = match.group(kind)
+                if escape.startswith("\\uc"):
+                    fallback = int(escape[3:])
+                elif in_row and (destination == NORMAL or destination == HEADER):
+                    cell_text.append(scoped_text(escape, fallback))
+                continue
+            if in_row and (destination == NORMAL or destination == HEADER):
+                cell_text.append(match.group(kind))
+        position = resume
+
+    if page_start is not None:
+        yield PageLayout(page_number, page_start, end,
+                         header_start, header_end, header_rows, rows, rtf_content)
@@ -0,0 +1,144 @@
+'''
+This module is used to run the RTF to JSON conversion from the command line
+It converts the RTF files of an input folder without the user interface,
+so it can be used on servers and in scheduled jobs
+It is run from the folder holding config.ini, in the same way as facade.py:
+
+    python -m Facade.command_line INPUT_FOLDER [--output OUTPUT_FOLDER]
+                                  [--workers N] [--format json] [--columnar] [--styles]
+                                  [--force]
+                                  [--trace {json,chrome}] [--profile {cprofile,tracemalloc}]
+                                  [--include GLOB] [--exclude GLOB] [--flat]
+                                  [--database FILE] [--memory-budget MB]
+
+The RTF files of the subfolders are converted as well, into the same subfolders
+of the output folder, unless --flat is given, and the largest files are converted first
+
+With --database, the tables of the converted files are also written to a SQLite
+database of that name in the output folder, with the files, pages, headers, titles,
+column headers, footnotes and subject rows of every file
+
+Files are only started while the memory they are estimated to need stays within
+the memory budget, measured from the peak memory of the files converted before
+
+Files that are unchanged since they were last converted to the output folder
+are skipped, unless --force, --trace or --profile is given
+A status line is printed for each file, followed by a summary with the throughput
+The exit code is 1 when any file fails, and 0 otherwise
+'''
+import argparse
+import os
+import sys
+import time
+
+from BatchProcessing import batch_processing, manifest, memory
+from JSONCreation import json_creation
+from Tracing import tracing
+
+def parse_arguments(arguments=None):
+    '''
+    Function to read the command line arguments
+    '''
+    parser = argparse.ArgumentParser(
+        prog="python -m Facade.command_line",
+        description="Convert the RTF files of a folder to JSON without the user interface")
+    parser.add_argument("input_folder", help="folder containing the RTF files")
+    parser.add_argument("-o", "--output", dest="output_folder",
+                        help="folder for the JSON files (default: INPUT_FOLDER/Output)")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="number of worker processes, 0 uses one for each CPU (default: 0)")
+    parser.add_argument("-f", "--format", dest="output_format", default="json",
+                        choices=sorted(json_creation.OUTPUT_FORMATS),
+                        help="output format (default: json)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="write the table data as one list of typed values for each column")
+    parser.add_argument("--styles", action="store_true",
+                        help="give the style of each section, along with the style table "
+                             "of the file")
+    parser.add_argument("--force", action="store_true",
+                        help="convert all the files, including the unchanged ones")
+    parser.add_argument("--trace", choices=tracing.TRACE_FORMATS,
+                        help="write the time of each conversion stage beside each output, "
+                             "as a JSON summary or a Chrome trace (implies --force)")
+    parser.add_argument("--profile", choices=tracing.PROFILE_MODES,
+                        help="convert each file under cProfile or tracemalloc, "
+                             "and write the profile beside its output (implies --force)")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="glob of the files to convert, matched against the name or the "
+                             "path in the input folder, can be given more than once "
+                             "(default: *.rtf)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="glob of the files and subfolders to leave out, "
+                             "can be given more than once")
+    parser.add_argument("--flat", action="store_true",
+                        help="only convert the files of the input folder, not its subfolders")
+    parser.add_argument("--database", metavar="FILE",
+                        help="also write the tables of the files to this SQLite database "
+                             "in the output folder")
+    parser.add_argument("--memory-budget", type=float, default=0, metavar="MB",
+                        help="megabytes of memory the files being converted may use, "
+                             "0 uses half of the physical memory (default: 0)")
+    return parser.parse_args(arguments)
+
+def format_summary(results, seconds):
+    '''
+    Function to create the summary line with the throughput of the conversion
+    '''
+    failed = sum(1 for result in results if result.status != "Successful")
+    skipped = sum(1 for result in results if result.remarks == manifest.SKIPPED_REMARKS)
+    # Only the files that were converted count towards the size and pages throughput
+    converted = [result for result in results if result.remarks != manifest.SKIPPED_REMARKS]
+    megabytes = sum(result.size for result in converted) / (1024 * 1024)
+    pages = sum(result.pages for result in converted)
+    seconds = max(seconds, 1e-9)
+    return (f"{len(results)} files, {len(results) - failed} successful "
+            f"({skipped} unchanged), {failed} failed "
+            f"in {seconds:.2f} s: {len(results) / seconds:.2f} files/s, "
+            f"{megabytes / seconds:.2f} MB/s, {pages / seconds:.2f} pages/s")
+
+def main(arguments=None):
+    '''
+    Function to convert the input folder and print the status of each file
+    Returns the exit code of the command
+    '''
+    arguments = parse_arguments(arguments)
+    input_folder = arguments.input_folder
+    if not os.path.isdir(input_folder):
+        print(f"{input_folder} is not a folder", file=sys.stderr)
+        return 2
+
+    output_directory = arguments.output_folder or os.path.join(input_folder, 'Output')
+    os.makedirs(output_directory, exist_ok=True)
+    files = batch_processing.scan_files(input_folder, arguments.include or ["*.rtf"],
+                                        arguments.exclude, not arguments.flat,
+                                        skip=[output_directory])
+
+    width = max([len(file) for file in files] + [len("File Name")])
+    print(f"{'File Name':<{width}}  {'Status':<10}  {'Pages':>6}  {'Size (MB)':>9}  "
+          f"{'Time (s)':>8}  Remarks")
+    table_layout = "columns" if arguments.columnar else "rows"
+    style_level = "ALL" if arguments.styles else "None"
+    results = []
+    start = time.perf_counter()
+    for result in batch_processing.convert_files(files, input_folder, output_directory,
+                                                 arguments.workers, arguments.output_format,
+                                                 incremental=True, force=arguments.force,
+                                                 trace=arguments.trace,
+                                                 profile=arguments.profile,
+                                                 table_layout=table_layout,
+                                                 database_file=arguments.database,
+                                                 memory_budget=memory.memory_budget(
+                                                     arguments.memory_budget),
+                                                 style_level=style_level):
+        results.append(result)
+        print(f"{result.file:<{width}}  {result.status:<10}  {result.pages:>6}  "
+              f"{result.size / (1024 * 1024):>9.2f}  {result.seconds:>8.2f}  {result.remarks}",
+              flush=True)
+    print(format_summary(results, time.perf_counter() - start))
+
+    if any(result.status != "Successful" for result in results):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+'''
+This module is used to run the RTF to JSON conversion as a local service
+The RTF files are converted by a pool of worker processes kept warm between requests,
+so pipeline tools get each file back without starting a new program for it
+It is run from the folder holding config.ini, in the same way as facade.py:
+
+    python -m Facade.conversion_service [--host HOST] [--port PORT]
+                                        [--workers N] [--queue N]
+
+The requests are JSON-RPC 2.0 requests sent by HTTP POST, for example:
+
+    curl -s http://127.0.0.1:8765 -d '{"jsonrpc": "2.0", "id": 1, "method": "convert",
+                                       "params": {"path": "/data/t_14_1_1.rtf"}}'
+
+The "convert" method takes the "path" of the file, or its "content" encoded in base64,
+along with the "style_level" and "table_layout" if needed, and gives the JSON of the file
+The "status" method, or a GET request, gives the number of requests being served
+A request that finds the queue full is answered with HTTP status 503
+The service runs until it is interrupted or terminated, and lets the requests
+being converted finish before it stops
+'''
+import argparse
+import signal
+import sys
+import threading
+
+from BatchProcessing import service
+from Configuration import configuration
+
+def parse_arguments(arguments=None):
+    '''
+    Function to read the command line arguments
+    '''
+    parser = argparse.ArgumentParser(
+        prog="python -m Facade.conversion_service",
+        description="Convert RTF files to JSON for the requests of a local JSON-RPC service")
+    parser.add_argument("--host", default=service.HOST,
+                        help=f"address to listen on (default: {service.HOST})")
+    parser.add_argument("-p", "--port", type=int, default=service.PORT,
+                        help=f"port to listen on (default: {service.PORT})")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="number of worker processes, 0 uses one for each CPU (default: 0)")
+    parser.add_argument("-q", "--queue", type=int, default=service.QUEUE_SIZE,
+                        help="number of requests that can wait for a worker process "
+                             f"before the service answers that it is busy "
+                             f"(default: {service.QUEUE_SIZE})")
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    '''
+    Function to run the service until it is interrupted
+    Returns the exit code of the command
+    '''
+    arguments = parse_arguments(arguments)
+    conversion_service = service.ConversionService(arguments.workers, arguments.queue)
+    stop_event = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop_event.set())
+
+    def ready(address):
+        print(f"Serving on http://{address[0]}:{address[1]} with "
+              f"{conversion_service.workers} workers", flush=True)
+
+    try:
+        service.serve(conversion_service, arguments.host, arguments.port, stop_event, ready)
+    except configuration.ConfigurationError as e:
+        print(f"The service cannot be started: {e}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"The service cannot listen on {arguments.host}:{arguments.port}: {e}",
+              file=sys.stderr)
+        return 2
+    print("Stopped serving")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -55,15 +55,13 @@ Includes dynamic extraction using control words and robust error handling.
 * CHANGE REASON: Implementation of Sprint 3 and Sprint 2 Corrections
 '''
 import os
-from configparser import ConfigParser
 
-from UI.user_Interface import user_interface
+from Configuration import configuration
 from DataExtraction import data_extraction
-from JSONCreation import json_creation
+from BatchProcessing import batch_processing, memory
 
 # Read config.ini file
-config_object = ConfigParser()
-config_object.read("config.ini")
+config_object = configuration.get_config()
 
 # Get the RTF tags, RE expressions and alignment data from the config file
 Debug_flag = config_object["DEBUG FLAG"]
@@ -72,42 +70,68 @@ RE_expressions = config_object["RE EXPRESSIONS"]
 Header_alignment = config_object['HEADER ALIGNMENT']
 Log_files = config_object['LOG FILE DETAILS']
 RTF_Style_Tags = config_object['RTF STYLE TAGS']
+Batch_processing = config_object['BATCH PROCESSING']
+
+# Number of worker processes used to convert the files, 0 uses one for each CPU
+WORKERS = int(Batch_processing['workers'])
+# Skip the files that are unchanged since they were last converted
+INCREMENTAL = Batch_processing.getboolean('incremental', fallback=False)
+# Convert the files of the subfolders, and the globs of the files to convert and to leave out
+RECURSIVE = Batch_processing.getboolean('recursive', fallback=False)
+INCLUDE = Batch_processing.get('include', fallback='*').split()
+EXCLUDE = Batch_processing.get('exclude', fallback='').split()
+# SQLite database of the output folder the tables of the files are exported to, if any
+DATABASE = Batch_processing.get('database', fallback='').strip() or None
+# Give the style of each section, along with the style table of each file
+STYLE_LEVEL = "ALL" if Batch_processing.getboolean('styles', fallback=False) else "None"
+# Memory budget of the conversions in megabytes, 0 uses a share of the physical memory
+MEMORY_BUDGET = memory.memory_budget(Batch_processing.getfloat('memory budget', fallback=0))
 
 def debug_print(content):
     data_extraction.debug_print(content)
 
-def process_files(selected_folder, table):
+def process_files(selected_folder, cancel_event=None):
     '''
     This function is used to process the files in the folder
     It creates an output directory in the parent folder
-    It iterates through the folder
+    It iterates through the folder and its subfolders, largest file first,
+    and the output of each file is written to the same subfolder of the output directory
     It checks if the file is an RTF file
     If the file is an RTF file, the schema of the file is checked
     If the file adheres to the schema, the file is converted to JSON
+    The files are converted in parallel by the worker processes
+    It returns the files of the folder and a generator giving the result of each file
+    in the order of the files, so that the conversion can run on a background thread
+    The conversion stops once the cancel event is set
+    Files that are unchanged since they were last converted are skipped
+    When a database is set in the config file, the tables of the converted files
+    are also written to it as the results come in
+    Files are only started while the memory they are estimated to need
+    stays within the memory budget
+    When styles is set in the config file, the style of each section is given
     '''
-    for row in table.get_children():
-        table.delete(row)
-
     if not selected_folder:
-        return
+        return [], iter(())
 
-    files = os.listdir(selected_folder)
     output_directory = os.path.join(selected_folder, 'Output')
     os.makedirs(output_directory, exist_ok=True)
+    files = batch_processing.scan_files(selected_folder, INCLUDE, EXCLUDE, RECURSIVE,
+                                        skip=[output_directory])
     print(f'{output_directory} successfully created')
-    file_no = 0
-    for file in files:
-        status, remarks, color, if_inc = data_extraction.process_file(file, file_no, selected_folder, output_directory, json_conversion)
-        if if_inc:
-            file_no += 1
-        table.insert("", "end", values=(file, status, remarks), tags=(color,))
-
-
-def json_conversion(json_dictionary, item, output_directory, write_success):
-    return json_creation.json_conversion(json_dictionary, item, output_directory, write_success)
-
-try:
-    user_interface(process_files, debug_print)
-
-except ImportError as e: #pragma nocover
-    debug_print("UI unsuccessful") #pragma nocover
+    results = batch_processing.convert_files(files, selected_folder, output_directory, WORKERS,
+                                             cancel_event=cancel_event, incremental=INCREMENTAL,
+                                             database_file=DATABASE,
+                                             memory_budget=MEMORY_BUDGET,
+                                             style_level=STYLE_LEVEL)
+    return files, results
+
+
+# The UI is only imported and started when this module is run, so that the worker
+# processes and other programs can import it without loading tkinter or opening a window
+if __name__ == "__main__":
+    try:
+        from UI.user_Interface import user_interface
+        user_interface(process_files, debug_print)
+
+    except ImportError as e: #pragma nocover
+        debug_print("UI unsuccessful") #pragma nocover
@@ -0,0 +1,83 @@
+'''
+This module is used to run the RTF to JSON conversion as a long running watcher
+The input folders are watched, and each RTF file that is dropped into them or changed
+is converted to the Output folder of its input folder once it has been fully written
+It is run from the folder holding config.ini, in the same way as facade.py:
+
+    python -m Facade.watch_folder INPUT_FOLDER [INPUT_FOLDER ...] [--workers N]
+                                  [--format json] [--columnar] [--styles]
+                                  [--interval SECONDS] [--settle SECONDS]
+
+A status line is printed for each converted file
+The watcher runs until it is interrupted or terminated, and lets the files
+being converted finish before it stops
+'''
+import argparse
+import os
+import signal
+import sys
+import threading
+
+from BatchProcessing import watcher
+from JSONCreation import json_creation
+
+def parse_arguments(arguments=None):
+    '''
+    Function to read the command line arguments
+    '''
+    parser = argparse.ArgumentParser(
+        prog="python -m Facade.watch_folder",
+        description="Watch folders and convert the RTF files dropped into them to JSON")
+    parser.add_argument("input_folders", nargs="+", metavar="input_folder",
+                        help="folder to watch for RTF files")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="number of worker processes, 0 uses one for each CPU (default: 0)")
+    parser.add_argument("-f", "--format", dest="output_format", default="json",
+                        choices=sorted(json_creation.OUTPUT_FORMATS),
+                        help="output format (default: json)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="write the table data as one list of typed values for each column")
+    parser.add_argument("--styles", action="store_true",
+                        help="give the style of each section, along with the style table "
+                             "of the file")
+    parser.add_argument("--interval", type=float, default=watcher.SCAN_INTERVAL,
+                        help="seconds between two scans of the folders "
+                             f"(default: {watcher.SCAN_INTERVAL})")
+    parser.add_argument("--settle", type=float, default=watcher.SETTLE_TIME,
+                        help="seconds a file must stay unchanged before it is converted "
+                             f"(default: {watcher.SETTLE_TIME})")
+    return parser.parse_args(arguments)
+
+def report(folder, result):
+    '''
+    Function to print the status line of a converted file
+    '''
+    print(f"{os.path.join(folder, result.file)}  {result.status}  {result.pages} pages  "
+          f"{result.seconds:.2f} s  {result.remarks}", flush=True)
+
+def main(arguments=None):
+    '''
+    Function to watch the input folders until the watcher is interrupted
+    Returns the exit code of the command
+    '''
+    arguments = parse_arguments(arguments)
+    missing = [folder for folder in arguments.input_folders if not os.path.isdir(folder)]
+    if missing:
+        print(f"{', '.join(missing)} is not a folder", file=sys.stderr)
+        return 2
+
+    table_layout = "columns" if arguments.columnar else "rows"
+    folder_watcher = watcher.FolderWatcher(arguments.input_folders, arguments.workers,
+                                           arguments.output_format, table_layout,
+                                           arguments.interval, arguments.settle,
+                                           "ALL" if arguments.styles else "None")
+    stop_event = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop_event.set())
+    print(f"Watching {', '.join(folder_watcher.folders)}", flush=True)
+    folder_watcher.run(stop_event, report)
+    print("Stopped watching")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+'''
+This module is used to export the tables of the converted files to a SQLite database
+The pages of each file are turned into rows for the files, pages, headers, titles,
+column headers, footnotes and subjects tables while the output of the file is written,
+so the tables of a whole folder can be queried without reading the JSON files again
+Each subject row is stored as one row for each of its cells, with the name of its column
+The database is written by a single writer, with one transaction for each file
+'''
+import json
+import sqlite3
+from datetime import datetime
+
+from JSONCreation import json_creation
+
+# Tables of the database, in the order their rows are inserted
+TABLES = ["pages", "headers", "titles", "columns", "footnotes", "subjects"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    pages INTEGER NOT NULL,
+    converted TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    file_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    footer TEXT
+);
+CREATE TABLE IF NOT EXISTS headers (
+    file_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT,
+    alignment TEXT
+);
+CREATE TABLE IF NOT EXISTS titles (
+    file_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS columns (
+    file_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS footnotes (
+    file_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS subjects (
+    file_id INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    column TEXT,
+    value
+);
+CREATE INDEX IF NOT EXISTS pages_page ON pages (file_id, page);
+CREATE INDEX IF NOT EXISTS headers_page ON headers (file_id, page);
+CREATE INDEX IF NOT EXISTS titles_page ON titles (file_id, page);
+CREATE INDEX IF NOT EXISTS columns_page ON columns (file_id, page);
+CREATE INDEX IF NOT EXISTS footnotes_page ON footnotes (file_id, page);
+CREATE INDEX IF NOT EXISTS subjects_page ON subjects (file_id, page, row);
+CREATE INDEX IF NOT EXISTS subjects_column ON subjects (column, file_id);
+"""
+
+# Statements inserting the rows of each table, with the file id as the first value
+INSERTS = {
+    "pages": "INSERT INTO pages VALUES (?, ?, ?)",
+    "headers": "INSERT INTO headers VALUES (?, ?, ?, ?, ?)",
+    "titles": "INSERT INTO titles VALUES (?, ?, ?, ?)",
+    "columns": "INSERT INTO columns VALUES (?, ?, ?, ?)",
+    "footnotes": "INSERT INTO footnotes VALUES (?, ?, ?)",
+    "subjects": "INSERT INTO subjects VALUES (?, ?, ?, ?, ?)",
+}
+
+def create_records():
+    '''
+    Function to create the empty rows of each table for a file
+    '''
+    return {table: [] for table in TABLES}
+
+def section_data(page, key):
+    '''
+    Function to get the data of a section of a page, with or without its style
+    '''
+    section = page.get(key)
+    if isinstance(section, dict) and 'data' in section:
+        return section['data']
+    return section
+
+def cell_value(value):
+    '''
+    Function to get the value stored for a cell, with the count and percentage pairs
+    of the columnar table data stored as JSON text
+    '''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def text_value(value):
+    '''
+    Function to get the text stored for the footnotes or footer of a page
+    A page without them gives an empty list, which is stored as None,
+    and the lines of a list are joined into one text
+    '''
+    if isinstance(value, (list, tuple)):
+        return "\n".join(str(line) for line in value) if value else None
+    return value
+
+def add_page(records, page_no, page):
+    '''
+    Function to add the rows of a page to the rows of each table, without the file id
+    '''
+    records["pages"].append((page_no, text_value(page.get('footer'))))
+    header = section_data(page, 'header') or {}
+    records["headers"].extend((page_no, position, text, alignment)
+                              for position, (text, alignment) in enumerate(header.items(),
+                                                                           start=1))
+    title = section_data(page, 'title') or []
+    records["titles"].extend((page_no, line, text)
+                             for line, text in enumerate(title, start=1))
+    columns = section_data(page, 'column headers') or []
+    records["columns"].extend((page_no, position, name)
+                              for position, name in enumerate(columns, start=1))
+    footnotes = text_value(page.get('footnotes'))
+    if footnotes:
+        records["footnotes"].append((page_no, footnotes))
+    subjects = records["subjects"]
+    for row_no, row in enumerate(json_creation.table_rows(section_data(page, 'subjects') or []),
+                                 start=1):
+        subjects.extend((page_no, row_no, column, cell_value(value))
+                        for column, value in row.items())
+
+def record_pages(pages, records):
+    '''
+    Function to add the rows of each page to the rows of each table as the page is given
+    '''
+    for page_no, page in enumerate(pages, start=1):
+        add_page(records, page_no, page)
+        yield page
+
+def recording_conversion(json_conversion, records):
+    '''
+    Function to wrap the writer of an output format, so that the rows of the database
+    are taken from the pages while they are written, without extracting them again
+    '''
+    def conversion(json_dictionary, item, output_directory, write_success):
+        json_dictionary['data'] = record_pages(json_dictionary.get('data', ()), records)
+        return json_conversion(json_dictionary, item, output_directory, write_success)
+    return conversion
+
+class Database:
+    '''
+    Class for the SQLite database of an output folder
+    The database is opened when the first file is written, in write-ahead logging mode,
+    so it can be read while the batch is running
+    The rows of a file replace the rows it had from an earlier conversion
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+
+    def open(self):
+        '''
+        Function to open the database and create its tables and indexes
+        '''
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def write(self, file, pages, records):
+        '''
+        Function to write the rows of a converted file in a single transaction
+        '''
+        connection = self.open()
+        with connection:
+            row = connection.execute("SELECT file_id FROM files WHERE file = ?",
+                                     (file,)).fetchone()
+            converted = datetime.now().isoformat()
+            if row is None:
+                file_id = connection.execute(
+                    "INSERT INTO files (file, pages, converted) VALUES (?, ?, ?)",
+                    (file, pages, converted)).lastrowid
+            else:
+                file_id = row[0]
+                connection.execute("UPDATE files SET pages = ?, converted = ? WHERE file_id = ?",
+                                   (pages, converted, file_id))
+                for table in TABLES:
+                    connection.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+            for table in TABLES:
+                connection.executemany(INSERTS[table],
+                                       ((file_id, *values) for values in records[table]))
+        return file_id
+
+    def close(self):
+        '''
+        Function to close the database
+        '''
+        if self.connection is None:
+            return
+        self.connection.close()
+        self.connection = None
@@ -1,22 +1,147 @@
 '''
 This module is used to create the json object for each RTF file
+The pages of the file are written as soon as they are extracted,
+so the whole document is never held in memory
 '''
 import json
 import os
 from datetime import datetime
 
-def json_conversion(json_dictionary, item, output_directory, write_success):
+# Indentation of the JSON files, and the separators of the compact JSON files
+JSON_INDENT = 4
+COMPACT_SEPARATORS = (",", ":")
+
+def output_path(item, output_directory, extension=".json"):
     '''
-    Function to create json file
+    Function to get the path of the output file of an RTF file
     '''
-    output_file = os.path.join(
+    return os.path.join(
         output_directory,
-        f"{os.path.splitext(os.path.basename(item))[0]}.json"
+        f"{os.path.splitext(os.path.basename(item))[0]}{extension}"
         )
-    def write_json_success(content):
-        write_success(content)
-    with open(output_file, 'w', encoding = "utf-8") as f:
-        json.dump(json_dictionary , f, ensure_ascii=False, indent=4)
-    write_json_success(datetime.now().isoformat() + f" Data successfully written to {output_file}\n")
+
+def iter_json(json_dictionary, indent=JSON_INDENT, separators=None):
+    '''
+    Function to encode the json dictionary piece by piece
+    The 'data' pages may be given by a generator, in which case each page is
+    encoded when it is extracted
+    With an indent, the text is the same as the one written by json.dump
+    '''
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=indent, separators=separators)
+
+    def indentation(level):
+        return "\n" + " " * (indent * level) if indent is not None else ""
+
+    def nested(value, level):
+        # JSON strings cannot hold a raw newline, so every line break of the
+        # encoded value starts a line of the nested block
+        text = encoder.encode(value)
+        return text.replace("\n", indentation(level)) if indent is not None else text
+
+    yield "{"
+    for key_no, (key, value) in enumerate(json_dictionary.items()):
+        if key_no:
+            yield encoder.item_separator
+        yield indentation(1) + encoder.encode(key) + encoder.key_separator
+        if key != 'data' or isinstance(value, (list, dict)):
+            yield nested(value, 1)
+            continue
+        empty = True
+        for page in value:
+            yield "[" if empty else encoder.item_separator
+            empty = False
+            yield indentation(2) + nested(page, 2)
+        yield "[]" if empty else indentation(1) + "]"
+    yield indentation(0) + "}" if json_dictionary else "}"
+
+def table_rows(table_data):
+    '''
+    Function to give the rows of the table data of a page
+    Columnar table data is turned back into one dictionary for each row
+    '''
+    if isinstance(table_data, dict):
+        columns = table_data['columns']
+        return [dict(zip(columns, values)) for values in zip(*table_data['values'])]
+    return table_data
+
+def iter_json_lines(json_dictionary, rows=False):
+    '''
+    Function to encode the json dictionary as JSON Lines
+    Each page is written on a line of its own, along with its page number
+    When rows is set, each subject row is written on a line of its own instead
+    The font and colour tables are not written, as the styles already hold
+    the font names and colours
+    When the pages refer to a style table, the table is written on the last line
+    '''
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    for page_no, page in enumerate(json_dictionary.get('data', ()), start=1):
+        if not rows:
+            yield encoder.encode({'page': page_no, **page}) + "\n"
+            continue
+        for row in table_rows(page['subjects']['data']):
+            yield encoder.encode({'page': page_no, 'row': row}) + "\n"
+    if not rows and json_dictionary.get('styles'):
+        yield encoder.encode({'styles': json_dictionary['styles']}) + "\n"
+
+def write_output(chunks, item, output_directory, write_success, extension=".json"):
+    '''
+    Function to write the encoded content to the output file of an RTF file
+    The content is written to a temporary file, which replaces the output file
+    once it is complete, so a failed conversion does not leave half a file behind
+    '''
+    output_file = output_path(item, output_directory, extension)
+    temporary_file = output_file + ".part"
+    try:
+        with open(temporary_file, 'w', encoding = "utf-8") as f:
+            f.writelines(chunks)
+        os.replace(temporary_file, output_file)
+    except BaseException:
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        raise
+    write_success(datetime.now().isoformat() + f" Data successfully written to {output_file}\n")
 
     return "Successful", ""
+
+def json_conversion(json_dictionary, item, output_directory, write_success):
+    '''
+    Function to create json file
+    '''
+    return write_output(iter_json(json_dictionary), item, output_directory, write_success)
+
+def compact_json_conversion(json_dictionary, item, output_directory, write_success):
+    '''
+    Function to create json file without indentation or spaces between the items
+    '''
+    chunks = iter_json(json_dictionary, indent=None, separators=COMPACT_SEPARATORS)
+    return write_output(chunks, item, output_directory, write_success)
+
+def json_lines_conversion(json_dictionary, item, output_directory, write_success):
+    '''
+    Function to create JSON Lines file with one page on each line
+    '''
+    return write_output(iter_json_lines(json_dictionary), item, output_directory,
+                        write_success, ".jsonl")
+
+def json_lines_rows_conversion(json_dictionary, item, output_directory, write_success):
+    '''
+    Function to create JSON Lines file with one subject row on each line
+    '''
+    return write_output(iter_json_lines(json_dictionary, rows=True), item, output_directory,
+                        write_success, ".jsonl")
+
+# Writers for each output format, selected by name in batch conversions
+OUTPUT_FORMATS = {
+    "json": json_conversion,
+    "json-compact": compact_json_conversion,
+    "jsonl": json_lines_conversion,
+    "jsonl-rows": json_lines_rows_conversion,
+}
+
+# Extension of the output files of each output format
+OUTPUT_EXTENSIONS = {
+    "json": ".json",
+    "json-compact": ".json",
+    "jsonl": ".jsonl",
+    "jsonl-rows": ".jsonl",
+}
@@ -1,32 +1,285 @@
 '''
 This function is used to log the successes and exceptions
+The log records are put on a queue, and a single writer thread writes them
+to the log files in batches, so the conversion never waits on the disk
+Each record holds the file, page, stage, duration and error it is about,
+and is written to the success or exceptions log file as text,
+and to the records log file as a JSON line
+The log files are rotated when they grow past the configured size,
+and the records still on the queue are written when the program exits
+Worker processes send their records to the queue of the main process
+The config.ini file is read, and the log files are opened, when the first record
+is logged, so importing this module does not touch any file
 '''
-from configparser import ConfigParser
+import atexit
+import json
+import os
+import queue
+import threading
 from datetime import datetime
 
-# Read config.ini file
-config_object = ConfigParser()
-config_object.read("config.ini")
+from Configuration import configuration
+
+# Default size a log file may reach before it is rotated, and number of rotated files kept
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+# Largest number of records written between two flushes of the log files
+BATCH_SIZE = 500
+
+# Put on a queue to stop the thread reading it
+STOP = None
+
+class LogFile:
+    '''
+    Class for a log file that is rotated when it grows past the maximum size
+    '''
+    def __init__(self, path, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file = None
+
+    def write(self, content):
+        '''
+        Function to write content to the log file, rotating it first if it is full
+        '''
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding = "utf-8")
+        size = self.file.tell()
+        if 0 < self.max_bytes < size + len(content) and size:
+            self.rotate()
+        self.file.write(content)
+
+    def rotate(self):
+        '''
+        Function to move the log file to the first backup, and each backup to the next one
+        '''
+        self.file.close()
+        for number in range(self.backup_count - 1, 0, -1):
+            backup = f"{self.path}.{number}"
+            if os.path.exists(backup):
+                os.replace(backup, f"{self.path}.{number + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a', encoding = "utf-8")
+
+    def flush(self):
+        '''
+        Function to write the buffered content onto the log file
+        '''
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        '''
+        Function to close the log file
+        '''
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class LogWriter:
+    '''
+    Class for the thread that writes the records of the queue onto the log files
+    '''
+    def __init__(self):
+        Log_files = configuration.get_config()['LOG FILE DETAILS']
+        max_bytes = Log_files.getint('max bytes', fallback=MAX_BYTES)
+        backup_count = Log_files.getint('backups', fallback=BACKUP_COUNT)
+        self.records = queue.Queue()
+        self.log_files = {"exceptions": LogFile(Log_files["exceptions"], max_bytes, backup_count),
+                          "success": LogFile(Log_files["success"], max_bytes, backup_count)}
+        records_file = Log_files.get("records")
+        self.records_file = (LogFile(records_file, max_bytes, backup_count) if records_file
+                             else None)
+        self.thread = threading.Thread(target=self.run, name="log writer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        '''
+        Function to write the records as they are put on the queue
+        The records waiting on the queue are written together, and the log files
+        are flushed once for each batch
+        '''
+        while True:
+            batch = [self.records.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            stop = STOP in batch
+            try:
+                for record in batch:
+                    if record is not STOP:
+                        self.write(record)
+                for log_file in self.log_files.values():
+                    log_file.flush()
+                if self.records_file is not None:
+                    self.records_file.flush()
+            finally:
+                for _ in batch:
+                    self.records.task_done()
+            if stop:
+                return
+
+    def write(self, record):
+        '''
+        Function to write a record onto its log file and the records log file
+        '''
+        if record.get("log") in self.log_files:
+            self.log_files[record["log"]].write(record["message"])
+        if self.records_file is not None:
+            self.records_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def stop(self):
+        '''
+        Function to write the records left on the queue, and close the log files
+        '''
+        self.records.put(STOP)
+        self.thread.join()
+        for log_file in self.log_files.values():
+            log_file.close()
+        if self.records_file is not None:
+            self.records_file.close()
+
+# The writer of the main process, started with the first record,
+# the thread passing on the records of the worker processes to it,
+# and the queue of the main process when this is a worker process
+writer = None
+forwarder = None
+worker_records = None
+writer_lock = threading.Lock()
+
+def get_writer():
+    '''
+    Function to get the writer of the main process, starting it when needed
+    The log files are started when the writer is started
+    '''
+    global writer
+    if writer is None:
+        with writer_lock:
+            if writer is None:
+                started = LogWriter()
+                started.records.put(start_record("exceptions"))
+                started.records.put(start_record("success"))
+                writer = started
+                atexit.register(stop_logging)
+    return writer
+
+def create_record(log, message, file=None, page=None, stage=None, duration=None, error=None):
+    '''
+    Function to create a record
+    The log is "success" or "exceptions" for the records written to those log files as text,
+    or None for the records only written to the records log file
+    '''
+    return {"time": datetime.now().isoformat(), "log": log, "message": message,
+            "file": file, "page": page, "stage": stage, "duration": duration, "error": error}
+
+def start_record(log):
+    '''
+    Function to create the record marking the start of a run in a log file
+    '''
+    return create_record(log, '\nSTART: ' + str(datetime.now()) + '\n')
+
+def log_record(log, message, **details):
+    '''
+    Function to log a record
+    The file, page, stage, duration and error can be given with the message
+    '''
+    record = create_record(log, message, **details)
+    if worker_records is not None:
+        worker_records.put(record)
+    else:
+        get_writer().records.put(record)
 
-Log_files = config_object['LOG FILE DETAILS']
-log_file_exceptions = open(Log_files["exceptions"], 'a', encoding = "utf-8")
-log_file_success = open(Log_files["success"], 'a', encoding = "utf-8")
 def start_logging():
     '''
     Function to open log files
+    The log files are started with the first record, so this only starts them early
     '''
-    log_file_exceptions.write('\nSTART: ' + str(datetime.now()) + '\n')
-    log_file_success.write('\nSTART: ' + str(datetime.now()) + '\n')
+    get_writer()
 
-def write_exceptions(content):
+def write_exceptions(content, **details):
     '''
     Function to write exceptions onto log file
+    The file, page, stage, duration and error can be given with the content
     '''
-    log_file_exceptions.write(content)
+    log_record("exceptions", content, **details)
 
-def write_success(content):
+def write_success(content, **details):
     '''
     Function to write success status onto log file
+    The file, page, stage, duration and error can be given with the content
+    '''
+    log_record("success", content, **details)
+
+
+def flush_logs():
+    '''
+    Function to write the logged records onto the log files
+    It waits until the writer has written every record logged so far
+    In a worker process, the records are written by the main process instead
+    '''
+    if worker_records is None and writer is not None:
+        writer.records.join()
+
+def stop_logging():
+    '''
+    Function to write the records left on the queue and close the log files,
+    called when the program exits
     '''
-    log_file_success.write(content)
+    global writer
+    if writer is not None:
+        writer.stop()
+        writer = None
 
+def forward_records(records):
+    '''
+    Function to pass the records of the worker processes on to the writer
+    '''
+    while True:
+        record = records.get()
+        if record is STOP:
+            return
+        get_writer().records.put(record)
+
+def start_worker_logging():
+    '''
+    Function to create the queue the worker processes send their records to
+    The records are passed on to the writer of the main process by a thread
+    Returns the queue, to be given to use_worker_queue in each worker process
+    '''
+    global forwarder
+    # multiprocessing is only imported when there are worker processes, as it is slow to import
+    import multiprocessing
+    records = multiprocessing.Queue()
+    forwarder = threading.Thread(target=forward_records, args=(records,),
+                                 name="log forwarder", daemon=True)
+    forwarder.start()
+    return records
+
+def stop_worker_logging(records):
+    '''
+    Function to stop passing on the records of the worker processes,
+    once every record they sent has been passed on
+    '''
+    global forwarder
+    records.put(STOP)
+    forwarder.join()
+    forwarder = None
+    records.close()
+    records.join_thread()
+
+def use_worker_queue(records):
+    '''
+    Function to send the records of this worker process to the main process
+    Used as the initializer of the worker processes
+    '''
+    global worker_records, writer
+    worker_records = records
+    # A forked worker has a copy of the writer of the main process, which it must not use
+    writer = None
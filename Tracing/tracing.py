@@ -0,0 +1,198 @@
+'''
+This module is used to trace the stages of the RTF to JSON conversion
+A tracer records the wall time, the number of calls and the bytes of RTF content
+scanned by each stage, for each page and for the whole file
+The trace is written as JSON, or in the Chrome trace event format,
+which can be opened in chrome://tracing or Perfetto
+Tracing is off unless a tracer is given to the conversion context,
+and the stages then cost a single extra function call
+A single file can also be converted under cProfile or tracemalloc
+'''
+import json
+import os
+import time
+import tracemalloc
+
+TRACE_FORMATS = ["json", "chrome"]
+PROFILE_MODES = ["cprofile", "tracemalloc"]
+
+# Number of lines written to the tracemalloc report
+TRACEMALLOC_LINES = 25
+
+def untraced_stage(name, page_layout, function, *args):
+    '''
+    Function to run a stage of the conversion when tracing is off
+    '''
+    return function(*args)
+
+def untraced_file_stage(name, size, function, *args):
+    '''
+    Function to run a stage of the conversion on the whole file when tracing is off
+    '''
+    return function(*args)
+
+def rows_bytes(rows):
+    '''
+    Function to get the bytes of RTF content of the rows
+    '''
+    return sum(row.end - row.start for row in rows)
+
+def stage_bytes(name, page_layout):
+    '''
+    Function to get the bytes of RTF content a stage scans on a page
+    '''
+    if name == "parse_page":
+        return page_layout.end - page_layout.start
+    if name == "extract_header":
+        if page_layout.header_start is None:
+            return 0
+        return (page_layout.header_end or page_layout.end) - page_layout.header_start
+    rows = page_layout.rows
+    header_rows = 0
+    for row in rows:
+        if not row.is_header:
+            break
+        header_rows += 1
+    if name == "extract_title":
+        return rows_bytes(rows[:max(header_rows - 1, 0)])
+    if name == "extract_column_headers":
+        return rows_bytes(rows[max(header_rows - 1, 0):max(header_rows, 1)])
+    if name == "extract_table_data":
+        return rows_bytes(rows[max(header_rows, 1):])
+    if name == "extract_footnotes":
+        return rows_bytes(rows[-1:]) if rows and rows[-1].keep_next else 0
+    return 0
+
+class Tracer:
+    '''
+    Class to record the time of each stage of the conversion of a file
+    '''
+    def __init__(self, file):
+        self.file = file
+        self.process = os.getpid()
+        self.origin = time.perf_counter()
+        # Events as (stage, page, start, seconds, bytes), with the start relative to the origin
+        self.events = []
+
+    def record(self, name, page, start, seconds, size):
+        '''
+        Function to record a stage that ran from the start for the given seconds
+        '''
+        self.events.append((name, page, start - self.origin, seconds, size))
+
+    def stage(self, name, page_layout, function, *args):
+        '''
+        Function to run a stage of the conversion on a page and record it
+        '''
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            page = page_layout.number if page_layout is not None else None
+            size = stage_bytes(name, page_layout) if page_layout is not None else 0
+            self.record(name, page, start, seconds, size)
+
+    def file_stage(self, name, size, function, *args):
+        '''
+        Function to run a stage of the conversion on the whole file and record it
+        '''
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.record(name, None, start, time.perf_counter() - start, size)
+
+    def trace_pages(self, page_layouts):
+        '''
+        Function to record the time taken to parse each page of the file
+        '''
+        page_layouts = iter(page_layouts)
+        while True:
+            start = time.perf_counter()
+            page_layout = next(page_layouts, None)
+            if page_layout is None:
+                return
+            self.record("parse_page", page_layout.number, start, time.perf_counter() - start,
+                        stage_bytes("parse_page", page_layout))
+            yield page_layout
+
+    def summary(self):
+        '''
+        Function to summarise the trace, with the totals of each stage
+        for the whole file and for each page
+        '''
+        stages = {}
+        pages = {}
+        for name, page, _, seconds, size in self.events:
+            totals = [stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0})]
+            if page is not None:
+                page_stages = pages.setdefault(page, {})
+                totals.append(page_stages.setdefault(name, {"calls": 0, "seconds": 0.0,
+                                                            "bytes": 0}))
+            for total in totals:
+                total["calls"] += 1
+                total["seconds"] += seconds
+                total["bytes"] += size
+        return {
+            "file": self.file,
+            "stages": stages,
+            "pages": [{"page": page, "stages": pages[page]} for page in sorted(pages)],
+        }
+
+    def chrome_trace(self):
+        '''
+        Function to give the trace in the Chrome trace event format
+        '''
+        events = []
+        for name, page, start, seconds, size in self.events:
+            arguments = {"bytes": size}
+            if page is not None:
+                arguments["page"] = page
+            events.append({"name": name, "cat": "conversion", "ph": "X",
+                           "ts": start * 1e6, "dur": seconds * 1e6,
+                           "pid": self.process, "tid": 0, "args": arguments})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"file": self.file}}
+
+    def write(self, output_path, trace_format="json"):
+        '''
+        Function to write the trace to a file
+        '''
+        trace = self.chrome_trace() if trace_format == "chrome" else self.summary()
+        with open(output_path, 'w', encoding="utf-8") as trace_file:
+            json.dump(trace, trace_file, ensure_ascii=False, indent=4)
+        return output_path
+
+def profile_call(output_path, mode, function, *args):
+    '''
+    Function to run a function under cProfile or tracemalloc
+    The cProfile statistics are saved to be read with pstats or snakeviz,
+    and the tracemalloc report lists the lines that allocated the most memory
+    Returns the result of the function
+    '''
+    if mode == "cprofile":
+        # cProfile and pstats are only imported when they are used, as they are slow to import
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function, *args)
+        finally:
+            pstats.Stats(profiler).dump_stats(output_path)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        return function(*args)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        with open(output_path, 'w', encoding="utf-8") as report:
+            report.write(f"Current memory: {current / (1024 * 1024):.2f} MB, "
+                         f"peak memory: {peak / (1024 * 1024):.2f} MB\n")
+            for statistic in snapshot.statistics("lineno")[:TRACEMALLOC_LINES]:
+                report.write(f"{statistic}\n")
@@ -2,6 +2,9 @@
 This module is used to provide the user interface for the code
 '''
 import os
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 
@@ -10,21 +13,100 @@ selected_folder_path = ""
 folder_path = ""
 table = ""
 
+# Milliseconds between two updates of the table while the files are converted
+POLL_INTERVAL = 100
+
 def user_interface(process_files, debug_print):
     '''
     This function is used to set up the User Interface
     '''
+    # Results are handed from the conversion thread to the UI through this queue,
+    # as Tk widgets may only be updated from the main thread
+    results_queue = queue.Queue()
+    cancel_event = threading.Event()
+    progress = {"total": 0, "done": 0, "start": 0.0}
+
+    def convert_folder(folder_selected):
+        '''
+        This function converts the folder on a background thread
+        The result of each file is put on the queue for the UI to pick up
+        '''
+        try:
+            files, results = process_files(folder_selected, cancel_event)
+            results_queue.put(("start", len(files)))
+            for result in results:
+                results_queue.put(("result", result))
+            results_queue.put(("done", cancel_event.is_set()))
+        except Exception as e:
+            results_queue.put(("error", str(e)))
+
     def upload_folder():
         '''
         This is a function to get the folder from the user
         This function uses the UI to accept and upload the folder
+        The folder is converted on a background thread, so the UI stays responsive
         '''
         folder_selected = filedialog.askdirectory()
         if folder_selected:
             folder_path.set(folder_selected)
             selected_folder_path = folder_selected
-            process_files(folder_selected, table)
+            for row in table.get_children():
+                table.delete(row)
+            cancel_event.clear()
+            progress.update(total=0, done=0, start=time.perf_counter())
+            progress_bar.configure(value=0, maximum=1)
+            speed_label.configure(text="Converting...")
+            upload_button.configure(state=tk.DISABLED)
+            cancel_button.configure(state=tk.NORMAL)
+            threading.Thread(target=convert_folder, args=(folder_selected,), daemon=True).start()
+            app.after(POLL_INTERVAL, poll_results)
+
+    def poll_results():
+        '''
+        This function adds the results converted since the last poll to the table
+        and updates the progress bar and the number of files converted per second
+        It polls again until the conversion is finished
+        '''
+        finished = False
+        while True:
+            try:
+                message, value = results_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message == "start":
+                progress["total"] = value
+                progress_bar.configure(maximum=max(value, 1))
+            elif message == "result":
+                table.insert("", "end", values=(value.file, value.status, value.remarks),
+                             tags=(value.color,))
+                progress["done"] += 1
+            elif message == "done":
+                finished = True
+                status = "Cancelled" if value else "Finished"
+            else:
+                finished = True
+                status = f"Failed: {value}"
+                debug_print(status)
+
+        seconds = max(time.perf_counter() - progress["start"], 1e-9)
+        progress_bar.configure(value=progress["done"])
+        speed = (f"{progress['done']}/{progress['total']} files, "
+                 f"{progress['done'] / seconds:.2f} files/s")
+        if finished:
+            speed_label.configure(text=f"{status} - {speed}")
+            upload_button.configure(state=tk.NORMAL)
+            cancel_button.configure(state=tk.DISABLED)
+        else:
+            speed_label.configure(text=speed)
+            app.after(POLL_INTERVAL, poll_results)
 
+    def on_cancel():
+        '''
+        This function is used to stop the conversion
+        The files that have already been started are finished before it stops
+        '''
+        cancel_event.set()
+        speed_label.configure(text="Cancelling...")
 
     def on_continue():
         '''
@@ -63,14 +145,21 @@ def user_interface(process_files, debug_print):
     subtitle2_label.place(relx=0.5, rely=0.2, anchor=tk.CENTER)
 
     upload_button = tk.Button(app, text="UPLOAD RTF FOLDER", command=upload_folder)
-    upload_button.place(relx=0.5, rely=0.25, anchor=tk.CENTER)
+    upload_button.place(relx=0.42, rely=0.25, anchor=tk.CENTER)
+    cancel_button = tk.Button(app, text="CANCEL", command=on_cancel, state=tk.DISABLED)
+    cancel_button.place(relx=0.62, rely=0.25, anchor=tk.CENTER)
+
+    progress_bar = ttk.Progressbar(app, orient="horizontal", mode="determinate")
+    progress_bar.place(relx=0.35, rely=0.31, anchor=tk.CENTER, relwidth=0.5)
+    speed_label = tk.Label(app, text="", font=("Times New Roman", 10))
+    speed_label.place(relx=0.8, rely=0.31, anchor=tk.CENTER)
     global table
     columns = ("File Name", "Status", "Remarks")
     table = ttk.Treeview(app, columns=columns, show="headings")
     table.heading("File Name", text="File Name")
     table.heading("Status", text="Status")
     table.heading("Remarks", text="Remarks")
-    table.place(relx=0.5, rely=0.57, anchor=tk.CENTER, relwidth=0.8, relheight=0.55)
+    table.place(relx=0.5, rely=0.6, anchor=tk.CENTER, relwidth=0.8, relheight=0.5)
 
     table.tag_configure('green', background='lightgreen')
     table.tag_configure('red', background='lightcoral')
@@ -0,0 +1,87 @@
+'''
+Shared fixtures of the tests
+The tests are run from the root of the repository with python -m pytest
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RTF_START = r"""{\rtf1\ansi\ansicpg1252\uc1\deff0\deflang1033\deflangfe1033
+{\fonttbl
+{\f1\froman\fprq2\fcharset0 Times New Roman;}
+}
+{\colortbl;\red0\green0\blue0;}
+"""
+
+def rtf_row(cells, header=False, keep_next=False, alignment="ql"):
+    '''
+    Function to create a table row of an RTF file
+    '''
+    width = 12960 // len(cells)
+    lines = ["\\trowd\\trkeep" + ("\\trhdr" if header else "") + "\\trqc\\trgaph0\\trleft0",
+             "".join(f"\\clvertalb\\cellx{width * (position + 1)}"
+                     for position in range(len(cells)))]
+    for cell in cells:
+        lines.append("\\pard\\plain\\intbl" + ("\\keepn" if keep_next else "") +
+                     f"\\sb0\\sa0\\{alignment}\\f1\\fs18\\cf1{{{cell}\\cell}}")
+    lines.append("{\\row}")
+    return "\n".join(lines) + "\n"
+
+def rtf_page(number, rows, footnote=None):
+    '''
+    Function to create a page of an RTF file, with its page header, title,
+    column headers and table rows, and the footnote when one is given
+    '''
+    page = ("\\sectd\\linex0\\endnhere\\sbkpage\\pgwsxn15840\\pghsxn12240\n"
+            "{\\header\\pard\\plain\n" + rtf_row(["Protocol: XYZ-123"]) + "}\n")
+    page += rtf_row([f"Table 14.1.{number}"], header=True, alignment="qc")
+    page += rtf_row(["Subject", "Age", "Sex"], header=True, alignment="qc")
+    for row in rows:
+        page += rtf_row(row)
+    if footnote is not None:
+        page += rtf_row([footnote], keep_next=True)
+    return page + "\\pard\\sect\n"
+
+def rtf_document():
+    '''
+    Function to create an RTF file of two pages, the second one without a footnote
+    '''
+    return (RTF_START +
+            rtf_page(1, [["001", "34", "F"], ["002", "41", "M"]],
+                     "Note: ages at screening. Source: ADSL") +
+            rtf_page(2, [["003", "", "F"]]) + "}")
+
+@pytest.fixture
+def rtf_file(tmp_path):
+    '''
+    Fixture to write an RTF file of two pages, the second one without a footnote
+    '''
+    path = tmp_path / "t_14_1.rtf"
+    path.write_text(rtf_document(), encoding="utf-8")
+    return path
+
+@pytest.fixture
+def rtf_folder(tmp_path):
+    '''
+    Fixture to write a folder of RTF files: a file of two pages, a larger copy of it
+    in a subfolder, a file without the RTF tags of the schema and a text file
+    '''
+    folder = tmp_path / "input"
+    (folder / "listings").mkdir(parents=True)
+    (folder / "t_14_1.rtf").write_text(rtf_document(), encoding="utf-8")
+    (folder / "listings" / "l_16_1.rtf").write_text(rtf_document() + " " * 1000,
+                                                    encoding="utf-8")
+    (folder / "bad.rtf").write_text("{\\rtf1 no table}", encoding="utf-8")
+    (folder / "notes.txt").write_text("not an RTF file", encoding="utf-8")
+    return folder
+
+@pytest.fixture(autouse=True)
+def working_folder(tmp_path, monkeypatch):
+    '''
+    Fixture to run each test in its own folder, so the log files are not written
+    to the repository, and the config.ini file beside the user interface is used
+    '''
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,95 @@
+'''
+Tests of the conversion of the files of a folder by the worker processes
+'''
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from BatchProcessing import batch_processing, memory
+
+FILES = ["listings/l_16_1.rtf", "t_14_1.rtf", "bad.rtf", "notes.txt"]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_files_gives_results_in_order_of_files(rtf_folder, tmp_path, workers):
+    output_folder = tmp_path / "Output"
+    results = list(batch_processing.convert_files(FILES, str(rtf_folder), str(output_folder),
+                                                  workers))
+    assert [(result.file, result.status, result.pages) for result in results] == [
+        ("listings/l_16_1.rtf", "Successful", 2), ("t_14_1.rtf", "Successful", 2),
+        ("bad.rtf", "Failed", 0), ("notes.txt", "Failed", 0)]
+    assert results[3].remarks == "Choose a RTF File"
+    assert sorted(str(path.relative_to(output_folder))
+                  for path in output_folder.rglob("*.json")) == ["listings/l_16_1.json",
+                                                                 "t_14_1.json"]
+
+def test_convert_files_gives_same_output_for_any_workers(rtf_folder, tmp_path):
+    outputs = []
+    for workers in (1, 2):
+        output_folder = tmp_path / f"Output{workers}"
+        list(batch_processing.convert_files(FILES[:2], str(rtf_folder), str(output_folder),
+                                            workers, output_format="jsonl"))
+        outputs.append([(output_folder / name).read_text(encoding="utf-8")
+                        for name in ("listings/l_16_1.jsonl", "t_14_1.jsonl")])
+    assert outputs[0] == outputs[1]
+
+def test_convert_files_stops_when_cancelled(rtf_folder, tmp_path):
+    cancel_event = threading.Event()
+    results = batch_processing.convert_files(FILES, str(rtf_folder), str(tmp_path / "Output"),
+                                             cancel_event=cancel_event)
+    assert next(results).file == FILES[0]
+    cancel_event.set()
+    assert list(results) == []
+
+def test_scan_files_gives_largest_file_first(rtf_folder):
+    (rtf_folder / "Output").mkdir()
+    (rtf_folder / "Output" / "old.rtf").write_text("{\\rtf1}", encoding="utf-8")
+    files = batch_processing.scan_files(str(rtf_folder), skip=[str(rtf_folder / "Output")])
+    assert files == [os.path.join("listings", "l_16_1.rtf"), "t_14_1.rtf", "bad.rtf"]
+
+def test_scan_files_with_globs(rtf_folder):
+    assert batch_processing.scan_files(str(rtf_folder), recursive=False) == ["t_14_1.rtf",
+                                                                              "bad.rtf"]
+    assert batch_processing.scan_files(str(rtf_folder), ["*.rtf", "*.txt"],
+                                       ["bad.rtf", "listings"]) == ["t_14_1.rtf", "notes.txt"]
+    assert batch_processing.scan_files(str(rtf_folder), ["listings/*"]) == [
+        os.path.join("listings", "l_16_1.rtf")]
+
+class PendingExecutor:
+    '''
+    Executor keeping the tasks it is given, as futures that are left to the test to finish
+    '''
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, function, task):
+        self.tasks.append(task)
+        return Future()
+
+def test_submit_tasks_keeps_estimated_memory_within_budget(tmp_path):
+    tasks = []
+    for name, size in (("a.rtf", 100), ("b.rtf", 100), ("c.rtf", 300)):
+        (tmp_path / name).write_bytes(b"x" * size)
+        tasks.append(batch_processing.ConversionTask(name, 0, str(tmp_path), str(tmp_path),
+                                                     "json"))
+    executor = PendingExecutor()
+    estimator = memory.MemoryEstimator(factor=1.0)
+    futures = []
+    running = {}
+    batch_processing.submit_tasks(executor, tasks, futures, running, 4, 250, estimator)
+    assert [task.file for task in executor.tasks] == ["a.rtf", "b.rtf"]
+    assert sum(running.values()) == 200
+
+    # A file needing more than the whole budget is only given once the others have finished
+    futures[0].set_result(batch_processing.FileResult("a.rtf", "Successful", "", "green", False,
+                                                      100, 1, 0.1))
+    batch_processing.release_tasks(running, estimator)
+    batch_processing.submit_tasks(executor, tasks, futures, running, 4, 250, estimator)
+    assert [task.file for task in executor.tasks] == ["a.rtf", "b.rtf"]
+    futures[1].set_result(batch_processing.FileResult("b.rtf", "Successful", "", "green", False,
+                                                      100, 1, 0.1))
+    batch_processing.release_tasks(running, estimator)
+    batch_processing.submit_tasks(executor, tasks, futures, running, 4, 250, estimator)
+    assert [task.file for task in executor.tasks] == ["a.rtf", "b.rtf", "c.rtf"]
+    assert list(running.values()) == [300]
@@ -0,0 +1,70 @@
+'''
+Tests of the command line batch mode
+'''
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from Facade import command_line
+
+def test_command_line_converts_folder(rtf_folder, capsys):
+    assert command_line.main([str(rtf_folder), "-w", "1"]) == 1
+    output = capsys.readouterr().out
+    assert "3 files, 2 successful (0 unchanged), 1 failed" in output
+    output_folder = rtf_folder / "Output"
+    data = json.loads((output_folder / "t_14_1.json").read_text(encoding="utf-8"))
+    assert [page['title']['data'] for page in data['data']] == [["Table 14.1.1"],
+                                                                ["Table 14.1.2"]]
+    assert (output_folder / "listings" / "l_16_1.json").is_file()
+    assert not (output_folder / "bad.json").exists()
+
+def test_command_line_skips_unchanged_files(rtf_folder, capsys):
+    arguments = [str(rtf_folder), "-w", "1", "--exclude", "bad.rtf"]
+    assert command_line.main(arguments) == 0
+    capsys.readouterr()
+    assert command_line.main(arguments) == 0
+    assert "2 files, 2 successful (2 unchanged), 0 failed" in capsys.readouterr().out
+    assert command_line.main(arguments + ["--force"]) == 0
+    assert "2 files, 2 successful (0 unchanged), 0 failed" in capsys.readouterr().out
+
+def test_command_line_output_options(rtf_folder, tmp_path, capsys):
+    output_folder = tmp_path / "jsonl"
+    assert command_line.main([str(rtf_folder), "-w", "1", "--flat", "--include", "t_*.rtf",
+                              "-o", str(output_folder), "-f", "jsonl-rows"]) == 0
+    assert "1 files, 1 successful" in capsys.readouterr().out
+    lines = (output_folder / "t_14_1.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)['row']['Subject'] for line in lines] == [1, 2, 3]
+
+def test_command_line_without_folder(tmp_path, capsys):
+    assert command_line.main([str(tmp_path / "missing")]) == 2
+    assert "is not a folder" in capsys.readouterr().err
+
+def test_command_line_does_not_import_tkinter():
+    code = ("import sys, Facade.command_line; "
+            "sys.exit('tkinter' in sys.modules or 'UI.user_Interface' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code],
+                          cwd=os.path.dirname(os.path.dirname(command_line.__file__))
+                          ).returncode == 0
+
+def test_command_line_styles(rtf_folder, capsys):
+    arguments = [str(rtf_folder), "-w", "1", "--flat", "--include", "t_*.rtf"]
+    assert command_line.main(arguments) == 0
+    capsys.readouterr()
+    # The files converted without the styles are not skipped when the styles are asked for
+    assert command_line.main(arguments + ["--styles"]) == 0
+    assert "1 files, 1 successful (0 unchanged)" in capsys.readouterr().out
+    data = json.loads((rtf_folder / "Output" / "t_14_1.json").read_text(encoding="utf-8"))
+    assert data['data'][0]['title']['style'] in data['styles']
+
+def test_command_line_exports_to_each_database(rtf_folder, capsys):
+    arguments = [str(rtf_folder), "-w", "1", "--flat", "--include", "t_*.rtf"]
+    for database_file in ("tables.db", "other.db"):
+        assert command_line.main(arguments + ["--database", database_file]) == 0
+        assert "1 files, 1 successful (0 unchanged)" in capsys.readouterr().out
+        with sqlite3.connect(rtf_folder / "Output" / database_file) as connection:
+            assert connection.execute("SELECT file, pages FROM files").fetchall() == [
+                ("t_14_1.rtf", 2)]
+    assert command_line.main(arguments + ["--database", "other.db"]) == 0
+    assert "1 files, 1 successful (1 unchanged)" in capsys.readouterr().out
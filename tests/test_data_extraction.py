@@ -0,0 +1,141 @@
+'''
+Tests of the extraction of the pages of the RTF files
+'''
+import io
+
+import pytest
+
+from DataExtraction import data_extraction
+
+from conftest import RTF_START, rtf_page
+
+def test_normalise_text_replaces_line_controls_and_spaces():
+    text = "{A\\~B{\\line}\r\nC\\page D}\r"
+    assert data_extraction.normalise_text(text) == "{A B C  D}\n"
+
+def test_normalise_text_keeps_text_without_sequences():
+    text = "{\\rtf1 plain text}"
+    assert data_extraction.normalise_text(text) is text
+
+def test_page_texts_splits_at_page_break_tags():
+    raw_content = b"{\\rtf1 preamble\\endnhere page 1\\endnhere page 2}"
+    assert list(data_extraction.page_texts(raw_content)) == [
+        "{\\rtf1 preamble", "\\endnhere page 1", "\\endnhere page 2}"]
+
+def test_page_texts_finds_tag_split_across_chunks():
+    padding = b"x" * (data_extraction.CHUNK_SIZE - 4)
+    raw_content = io.BytesIO(padding + b"\\endnhere page 1 \xe2\x89\xa4")
+    texts = list(data_extraction.page_texts(raw_content))
+    assert texts == [padding.decode(), "\\endnhere page 1 ≤"]
+
+def test_iter_pages_gives_each_page(rtf_file):
+    context = data_extraction.ConversionContext()
+    pages = list(data_extraction.iter_pages(str(rtf_file), context))
+    assert context.numpages == 2
+    assert context.json_dictionary['fonts'] == {'f1': 'Times New Roman'}
+    assert [page['title']['data'] for page in pages] == [["Table 14.1.1"], ["Table 14.1.2"]]
+    assert pages[0]['column headers']['data'] == ["Subject", "Age", "Sex"]
+    assert pages[0]['subjects']['data'] == [{"Subject": 1, "Age": 34, "Sex": "F"},
+                                            {"Subject": 2, "Age": 41, "Sex": "M"}]
+    assert pages[0]['footnotes'] == "Note: ages at screening. "
+    assert pages[0]['footer'] == "Source: ADSL"
+
+def test_iter_pages_gives_page_without_footer(rtf_file):
+    pages = list(data_extraction.iter_pages(str(rtf_file)))
+    assert pages[1]['subjects']['data'] == [{"Subject": 3, "Age": "", "Sex": "F"}]
+    assert not pages[1]['footnotes']
+    assert not pages[1]['footer']
+
+SCHEMA_TAGS = ["\\header", "\\trhdr", "\\trowd", "\\row", "\\cell"]
+
+def test_missing_tags_reports_all_missing_tags_in_order():
+    raw_content = b"{\\rtf1{\\header}\\trowd\\cell}"
+    assert data_extraction.missing_tags(raw_content, SCHEMA_TAGS) == ["\\trhdr", "\\row"]
+
+def test_missing_tags_finds_every_tag():
+    raw_content = b"{\\header\\trowd\\trhdr{A\\cell}{\\row}}"
+    assert data_extraction.missing_tags(raw_content, SCHEMA_TAGS) == []
+
+def test_missing_tags_finds_tag_split_across_chunks():
+    padding = b"x" * (data_extraction.CHUNK_SIZE - 3)
+    raw_content = io.BytesIO(padding + b"\\trhdr" + b"\\header\\trowd\\row\\cell")
+    assert data_extraction.missing_tags(raw_content, SCHEMA_TAGS) == []
+
+def test_missing_tags_without_tags():
+    assert data_extraction.missing_tags(b"", []) == []
+
+def test_check_rtf_reads_file(rtf_file, tmp_path):
+    assert data_extraction.check_rtf(str(rtf_file))
+    bad_file = tmp_path / "bad.rtf"
+    bad_file.write_bytes(b"{\\rtf1\\trowd{A\\cell}{\\row}}")
+    assert not data_extraction.check_rtf(str(bad_file))
+
+def test_column_type_of_each_kind_of_column():
+    assert data_extraction.column_type(["1", "", "-2"]) is int
+    assert data_extraction.column_type(["1", "2.5"]) is float
+    assert data_extraction.column_type(["10 (12.5%)", "3 (4%)"]) is \
+        data_extraction.count_percent
+    assert data_extraction.column_type(["1", "F"]) is None
+    assert data_extraction.column_type(["", ""]) is None
+
+def test_typed_column_converts_every_cell():
+    assert data_extraction.typed_column(["1", "", "-2"]) == [1, None, -2]
+    assert data_extraction.typed_column(["1", "2.5"]) == [1.0, 2.5]
+    assert data_extraction.typed_column(["10 (12.5%)", ""]) == [[10, 12.5], None]
+    assert data_extraction.typed_column(["1", "F", ""]) == ["1", "F", None]
+
+def test_table_columns_gives_typed_columns():
+    rows = [["001", "34", "F"], ["002", ""]]
+    assert data_extraction.table_columns(rows, ["Subject", "Age", "Sex"]) == {
+        'columns': ["Subject", "Age", "Sex"], 'values': [[1, 2], [34, None], ["F", None]]}
+    assert data_extraction.table_columns([], ["Subject"]) == {'columns': ["Subject"],
+                                                              'values': [[]]}
+
+def test_iter_pages_with_columns_layout(rtf_file):
+    context = data_extraction.ConversionContext(table_layout="columns")
+    pages = list(data_extraction.iter_pages(str(rtf_file), context))
+    assert pages[0]['subjects']['data'] == {'columns': ["Subject", "Age", "Sex"],
+                                            'values': [[1, 2], [34, 41], ["F", "M"]]}
+
+def test_iter_pages_with_unicode_fallback_of_header(tmp_path):
+    path = tmp_path / "t_14_2.rtf"
+    for header, age in (("\\uc0", "\\u8805 65"), ("\\uc2", "\\u8805\\'3e=65")):
+        path.write_text(RTF_START.replace("\\uc1", header) +
+                        rtf_page(1, [["001", age, "F"]]) + "}", encoding="utf-8")
+        pages = list(data_extraction.iter_pages(str(path)))
+        assert pages[0]['subjects']['data'] == [{"Subject": 1, "Age": "≥65", "Sex": "F"}]
+
+def test_extract_pages_gives_requested_pages(rtf_file):
+    json_dictionary = data_extraction.extract_pages(str(rtf_file), pages=[2])
+    assert json_dictionary['fonts'] == {'f1': 'Times New Roman'}
+    assert [page['title']['data'] for page in json_dictionary['data']] == [["Table 14.1.2"]]
+    assert json_dictionary['data'][0]['header']['data'] == {"Protocol: XYZ-123": "l"}
+    json_dictionary = data_extraction.extract_pages(str(rtf_file), first=1)
+    assert [page['title']['data'] for page in json_dictionary['data']] == [["Table 14.1.1"]]
+
+def test_extract_pages_gives_same_pages_as_iter_pages(rtf_file):
+    pages = list(data_extraction.iter_pages(str(rtf_file)))
+    assert data_extraction.extract_pages(str(rtf_file))['data'] == pages
+
+def test_extract_pages_rejects_missing_page(rtf_file):
+    with pytest.raises(ValueError, match="Page 3"):
+        data_extraction.extract_pages(str(rtf_file), pages=[1, 3])
+
+def test_convert_with_styles_gives_style_table(tmp_path):
+    path = tmp_path / "t_14_1.rtf"
+    path.write_text(RTF_START + rtf_page(1, [["001", "34", "F"]]) +
+                    rtf_page(2, [["\\b\\i0 002", "41", "M"]]) + "}", encoding="utf-8")
+    json_dictionary = data_extraction.convert(str(path), "ALL")
+    pages = json_dictionary['data']
+    assert [(page['title']['style'], page['subjects']['style']) for page in pages] == [
+        ("s1", "s1"), ("s1", "s2")]
+    assert pages[1]['subjects']['data'][0]['Subject'] == 2
+    styles = json_dictionary['styles']
+    assert sorted(styles) == ["s1", "s2"]
+    assert styles["s1"]["font"] == "Times New Roman" and styles["s1"]["size"] == 18
+    assert (styles["s1"]["bold"], styles["s2"]["bold"]) == ("", "YES")
+
+def test_convert_without_styles_gives_no_style_table(rtf_file):
+    json_dictionary = data_extraction.convert(str(rtf_file))
+    assert "styles" not in json_dictionary
+    assert json_dictionary['data'][0]['title'] == {'style': None, 'data': ["Table 14.1.1"]}
@@ -0,0 +1,56 @@
+'''
+Tests of the rows of the database tables taken from the pages of a file
+'''
+from JSONCreation import database
+
+PAGE = {
+    "header": {"style": None, "data": {"Protocol: XYZ-123": "l", "Page 1 of 2": "r"}},
+    "title": {"style": None, "data": ["Table 14.1.1", "Safety Population"]},
+    "column headers": {"style": None, "data": ["Subject", "Age", "Count"]},
+    "subjects": {"style": None, "data": [{"Subject": 1, "Age": 34, "Count": [10, 12.5]}]},
+    "footnotes": "Note: ages at screening. ",
+    "footer": "Source: ADSL",
+}
+
+def test_add_page_adds_rows_of_each_table():
+    records = database.create_records()
+    database.add_page(records, 1, PAGE)
+    assert records == {
+        "pages": [(1, "Source: ADSL")],
+        "headers": [(1, 1, "Protocol: XYZ-123", "l"), (1, 2, "Page 1 of 2", "r")],
+        "titles": [(1, 1, "Table 14.1.1"), (1, 2, "Safety Population")],
+        "columns": [(1, 1, "Subject"), (1, 2, "Age"), (1, 3, "Count")],
+        "footnotes": [(1, "Note: ages at screening. ")],
+        "subjects": [(1, 1, "Subject", 1), (1, 1, "Age", 34), (1, 1, "Count", "[10, 12.5]")],
+    }
+
+def test_add_page_without_footer():
+    records = database.create_records()
+    database.add_page(records, 2, {**PAGE, "footnotes": [], "footer": []})
+    assert records["pages"] == [(2, None)]
+    assert records["footnotes"] == []
+
+def test_add_page_joins_lines_of_footer():
+    records = database.create_records()
+    database.add_page(records, 1, {**PAGE, "footer": ["Source: ADSL", "Program: t_14_1.sas"]})
+    assert records["pages"] == [(1, "Source: ADSL\nProgram: t_14_1.sas")]
+
+def test_add_page_with_columnar_table_data():
+    records = database.create_records()
+    subjects = {"columns": ["Subject", "Age"], "values": [[1, 2], [34, None]]}
+    database.add_page(records, 1, {**PAGE, "subjects": {"style": None, "data": subjects}})
+    assert records["subjects"] == [(1, 1, "Subject", 1), (1, 1, "Age", 34),
+                                   (1, 2, "Subject", 2), (1, 2, "Age", None)]
+
+def test_database_writes_page_without_footer(tmp_path):
+    records = database.create_records()
+    database.add_page(records, 1, {**PAGE, "footnotes": [], "footer": []})
+    file_database = database.Database(str(tmp_path / "tables.db"))
+    try:
+        file_database.write("t_14_1.rtf", 1, records)
+        file_database.write("t_14_1.rtf", 1, records)
+        connection = file_database.open()
+        assert connection.execute("SELECT page, footer FROM pages").fetchall() == [(1, None)]
+        assert connection.execute("SELECT COUNT(*) FROM subjects").fetchone() == (3,)
+    finally:
+        file_database.close()
@@ -0,0 +1,66 @@
+'''
+Tests of the writers of the JSON and JSON Lines output files
+'''
+import json
+
+import pytest
+
+from JSONCreation import json_creation
+
+PAGES = [
+    {"title": {"style": None, "data": ["Table 14.1.1"]},
+     "subjects": {"style": None, "data": [{"Subject": 1, "Age": 34}, {"Subject": 2, "Age": 41}]}},
+    {"title": {"style": None, "data": ["Table 14.1.2"]},
+     "subjects": {"style": None, "data": {"columns": ["Subject", "Age"],
+                                          "values": [[3], [None]]}}},
+]
+
+def json_dictionary():
+    '''
+    Function to give the JSON dictionary of a file, with its pages given by a generator
+    '''
+    return {"fonts": {"f1": "Times New Roman"}, "data": (page for page in PAGES)}
+
+@pytest.mark.parametrize("indent, separators", [(json_creation.JSON_INDENT, None),
+                                                (None, json_creation.COMPACT_SEPARATORS)])
+def test_iter_json_matches_json_dumps(indent, separators):
+    text = "".join(json_creation.iter_json(json_dictionary(), indent, separators))
+    expected = {"fonts": {"f1": "Times New Roman"}, "data": PAGES}
+    assert text == json.dumps(expected, ensure_ascii=False, indent=indent,
+                              separators=separators)
+
+def test_iter_json_without_pages():
+    text = "".join(json_creation.iter_json({"fonts": {}, "data": iter(())}))
+    assert json.loads(text) == {"fonts": {}, "data": []}
+
+def test_iter_json_lines_gives_each_page():
+    lines = list(json_creation.iter_json_lines(json_dictionary()))
+    assert [json.loads(line) for line in lines] == [{"page": 1, **PAGES[0]},
+                                                    {"page": 2, **PAGES[1]}]
+
+def test_iter_json_lines_gives_each_row():
+    lines = list(json_creation.iter_json_lines(json_dictionary(), rows=True))
+    assert [json.loads(line) for line in lines] == [
+        {"page": 1, "row": {"Subject": 1, "Age": 34}},
+        {"page": 1, "row": {"Subject": 2, "Age": 41}},
+        {"page": 2, "row": {"Subject": 3, "Age": None}}]
+
+@pytest.mark.parametrize("output_format", sorted(json_creation.OUTPUT_FORMATS))
+def test_writers_write_output_file(tmp_path, output_format):
+    messages = []
+    status = json_creation.OUTPUT_FORMATS[output_format](json_dictionary(), "t_14_1.rtf",
+                                                         str(tmp_path), messages.append)
+    extension = json_creation.OUTPUT_EXTENSIONS[output_format]
+    assert status == ("Successful", "")
+    assert len(messages) == 1
+    assert [path.name for path in tmp_path.iterdir()] == ["t_14_1" + extension]
+
+def test_writer_leaves_no_file_when_it_fails(tmp_path):
+    def failing_pages():
+        yield PAGES[0]
+        raise ValueError("page cannot be extracted")
+
+    with pytest.raises(ValueError):
+        json_creation.json_conversion({"data": failing_pages()}, "t_14_1.rtf",
+                                      str(tmp_path), print)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,73 @@
+'''
+Tests of the queue-fed writer of the log files and of their rotation
+'''
+import json
+import multiprocessing
+
+import pytest
+
+from Logger import logging
+
+@pytest.fixture
+def log_writer(monkeypatch):
+    '''
+    Fixture to give a writer of the log files of the working folder, used as the
+    writer of this process, and stopped after the test
+    '''
+    writer = logging.LogWriter()
+    monkeypatch.setattr(logging, "writer", writer)
+    monkeypatch.setattr(logging, "worker_records", None)
+    yield writer
+    writer.stop()
+
+def read_records(path="Log File Records.jsonl"):
+    '''
+    Function to read the records log file
+    '''
+    with open(path, 'r', encoding="utf-8") as records_file:
+        return [json.loads(line) for line in records_file]
+
+def log_from_worker(records, file):
+    '''
+    Function to log a record from a worker process
+    '''
+    logging.use_worker_queue(records)
+    logging.write_exceptions(f"{file} cannot be converted\n", file=file, stage="worker")
+
+def test_log_file_is_rotated(tmp_path):
+    path = str(tmp_path / "log.txt")
+    log_file = logging.LogFile(path, max_bytes=10, backup_count=2)
+    for line in ("first\n", "second\n", "third\n", "fourth\n"):
+        log_file.write(line)
+    log_file.close()
+    contents = [open(name, encoding="utf-8").read()
+                for name in (path, path + ".1", path + ".2")]
+    assert contents == ["fourth\n", "third\n", "second\n"]
+    assert not (tmp_path / "log.txt.3").exists()
+
+def test_writer_writes_each_record(log_writer):
+    logging.write_success("File converted\n", file="t_14_1.rtf", duration=0.5)
+    logging.write_exceptions("Page not extracted\n", file="t_14_1.rtf", page=2,
+                             stage="extract_title", error="bad row")
+    logging.log_record(None, "Successful", file="t_14_1.rtf", stage="convert_file")
+    logging.flush_logs()
+    with open("Log File Exceptions.txt", 'r', encoding="utf-8") as exceptions_file:
+        assert exceptions_file.read().endswith("Page not extracted\n")
+    records = read_records()
+    assert [(record["log"], record["message"]) for record in records] == [
+        ("success", "File converted\n"), ("exceptions", "Page not extracted\n"),
+        (None, "Successful")]
+    assert records[1]["page"] == 2 and records[1]["error"] == "bad row"
+
+def test_worker_records_are_written_by_main_process(log_writer):
+    records = logging.start_worker_logging()
+    workers = [multiprocessing.Process(target=log_from_worker, args=(records, f"t_{number}.rtf"))
+               for number in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    logging.stop_worker_logging(records)
+    logging.flush_logs()
+    assert sorted(record["file"] for record in read_records() if record["stage"] == "worker") \
+        == ["t_0.rtf", "t_1.rtf", "t_2.rtf"]
@@ -0,0 +1,70 @@
+'''
+Tests of the checks of the manifest for the files unchanged since they were converted
+'''
+import os
+
+import pytest
+
+from BatchProcessing import manifest
+
+CONFIG = "config hash"
+
+@pytest.fixture
+def converted_file(tmp_path):
+    '''
+    Fixture to give an RTF file, its output folder and its manifest entry
+    '''
+    path = tmp_path / "t_14_1.rtf"
+    path.write_bytes(b"{\\rtf1 content}")
+    output_directory = tmp_path / "Output"
+    output_directory.mkdir()
+    (output_directory / "t_14_1.json").write_text("{}", encoding="utf-8")
+    entry = manifest.create_entry("t_14_1.rtf", str(path), CONFIG, "t_14_1.json", 1)
+    return path, str(output_directory), entry
+
+def test_is_unchanged_for_same_file(converted_file):
+    path, output_directory, entry = converted_file
+    assert manifest.is_unchanged(str(path), entry, CONFIG, output_directory)
+
+def test_is_unchanged_without_entry(converted_file):
+    path, output_directory, _ = converted_file
+    assert not manifest.is_unchanged(str(path), None, CONFIG, output_directory)
+
+def test_is_unchanged_with_other_config(converted_file):
+    path, output_directory, entry = converted_file
+    assert not manifest.is_unchanged(str(path), entry, "other config", output_directory)
+
+def test_is_unchanged_with_other_version(converted_file):
+    path, output_directory, entry = converted_file
+    entry["version"] = "0.0.0"
+    assert not manifest.is_unchanged(str(path), entry, CONFIG, output_directory)
+
+def test_is_unchanged_without_output(converted_file):
+    path, output_directory, entry = converted_file
+    os.remove(os.path.join(output_directory, "t_14_1.json"))
+    assert not manifest.is_unchanged(str(path), entry, CONFIG, output_directory)
+
+def test_is_unchanged_with_other_content(converted_file):
+    path, output_directory, entry = converted_file
+    path.write_bytes(b"{\\rtf1 changed}")
+    assert not manifest.is_unchanged(str(path), entry, CONFIG, output_directory)
+
+def test_is_unchanged_when_only_touched(converted_file):
+    path, output_directory, entry = converted_file
+    os.utime(path, ns=(entry["mtime"] + 10 ** 9, entry["mtime"] + 10 ** 9))
+    assert manifest.is_unchanged(str(path), entry, CONFIG, output_directory)
+
+def test_is_unchanged_with_same_size_and_other_content(converted_file):
+    path, output_directory, entry = converted_file
+    path.write_bytes(b"{\\rtf1 CONTENT}")
+    os.utime(path, ns=(entry["mtime"] + 10 ** 9, entry["mtime"] + 10 ** 9))
+    assert not manifest.is_unchanged(str(path), entry, CONFIG, output_directory)
+
+def test_config_hash_changes_with_style_level():
+    assert manifest.config_hash() == manifest.config_hash(style_level="None")
+    assert manifest.config_hash() != manifest.config_hash(style_level="ALL")
+
+def test_config_hash_changes_with_database_file():
+    hashes = {manifest.config_hash(database_file=database_file)
+              for database_file in (None, "tables.db", "other.db")}
+    assert len(hashes) == 3
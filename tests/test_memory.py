@@ -0,0 +1,36 @@
+'''
+Tests of the estimate of the memory needed by the files and of the memory budget
+'''
+from BatchProcessing import memory
+
+MEGABYTE = 1024 * 1024
+
+def test_estimate_uses_default_factor_until_measured():
+    estimator = memory.MemoryEstimator()
+    assert estimator.estimate(1000) == int(1000 * memory.DEFAULT_FACTOR)
+
+def test_record_keeps_largest_ratio_of_large_files():
+    estimator = memory.MemoryEstimator()
+    estimator.record(2 * MEGABYTE, 6 * MEGABYTE)
+    estimator.record(4 * MEGABYTE, 8 * MEGABYTE)
+    # Small files and files whose memory was not measured leave the factor alone
+    estimator.record(1000, 100 * MEGABYTE)
+    estimator.record(8 * MEGABYTE, None)
+    assert estimator.factor == 3.0
+    assert estimator.estimate(MEGABYTE) == 3 * MEGABYTE
+
+def test_estimator_is_measured_from_manifest_entries():
+    estimator = memory.MemoryEstimator.from_entries(
+        [{"size": 2 * MEGABYTE, "memory": 10 * MEGABYTE}, {"size": 100}])
+    assert estimator.factor == 5.0
+
+def test_memory_budget(monkeypatch):
+    assert memory.memory_budget(1.5) == int(1.5 * MEGABYTE)
+    monkeypatch.setattr(memory, "physical_memory", lambda: 8 * MEGABYTE)
+    assert memory.memory_budget() == int(8 * MEGABYTE * memory.BUDGET_SHARE)
+    monkeypatch.setattr(memory, "physical_memory", lambda: None)
+    assert memory.memory_budget() is None
+
+def test_used_memory_is_not_negative():
+    assert memory.used_memory(memory.start_measure()) >= 0
+    assert memory.used_memory(None) is None
@@ -0,0 +1,112 @@
+'''
+Tests of the single pass RTF tokenizer and of the page layouts built on it
+'''
+from DataExtraction import rtf_tokenizer
+
+from conftest import rtf_document
+
+def page_layouts(rtf_content, numpages=1):
+    '''
+    Function to give the layout of each page of the RTF content
+    '''
+    return list(rtf_tokenizer.parse_pages(rtf_content, numpages))
+
+def cells(rtf_content):
+    '''
+    Function to give the cells of each body row of the first page of the RTF content
+    '''
+    return [row.cells for row in page_layouts(rtf_content)[0].rows]
+
+def test_tokenize_gives_each_kind_of_token():
+    tokens = list(rtf_tokenizer.tokenize("\\b\\fs18{A\\cell}{\\i B\\'e9\\u8805 C}\\~\\endnhere2"))
+    assert [(token.kind, token.value, token.param) for token in tokens] == [
+        (rtf_tokenizer.CELL_GROUP, "A", None),
+        (rtf_tokenizer.GROUP_START, "{", None),
+        (rtf_tokenizer.FORMATTING, "\\i ", None),
+        (rtf_tokenizer.TEXT, "B", None),
+        (rtf_tokenizer.HEX_ESCAPE, "e9", None),
+        (rtf_tokenizer.UNICODE_ESCAPE, "\\u8805 ", None),
+        (rtf_tokenizer.TEXT, "C", None),
+        (rtf_tokenizer.GROUP_END, "}", None),
+        (rtf_tokenizer.CONTROL_SYMBOL, "~", None),
+        (rtf_tokenizer.CONTROL_WORD, "endnhere", 2),
+    ]
+
+def test_tokenize_gives_plain_rows_and_groups():
+    tokens = list(rtf_tokenizer.tokenize("\\trowd\\trhdr{A\\cell}{B\\cell}{\\row}{\\b C}"))
+    assert [(token.kind, token.value) for token in tokens] == [
+        (rtf_tokenizer.TABLE_ROW, ["A", "B"]),
+        (rtf_tokenizer.GROUP_START, "{"),
+        (rtf_tokenizer.FORMATTING, "\\b "),
+        (rtf_tokenizer.TEXT, "C"),
+        (rtf_tokenizer.GROUP_END, "}"),
+    ]
+
+def test_parse_pages_gives_each_page():
+    rtf_content = rtf_document()
+    layouts = page_layouts(rtf_content, 2)
+    assert [layout.number for layout in layouts] == [1, 2]
+    assert layouts[0].end == layouts[1].start == \
+        rtf_content.find("\\endnhere", layouts[0].start + 1)
+    assert [row.cells for row in layouts[0].header_rows] == [["Protocol: XYZ-123"]]
+    assert [(row.cells, row.is_header, row.keep_next) for row in layouts[0].rows] == [
+        (["Table 14.1.1"], True, False),
+        (["Subject", "Age", "Sex"], True, False),
+        (["001", "34", "F"], False, False),
+        (["002", "41", "M"], False, False),
+        (["Note: ages at screening. Source: ADSL"], False, True),
+    ]
+    assert [row.cells for row in layouts[1].rows][-1] == ["003", "", "F"]
+
+def test_parse_pages_from_page_span():
+    rtf_content = rtf_document()
+    span = rtf_tokenizer.index_pages(rtf_content)[1]
+    layouts = list(rtf_tokenizer.parse_pages(rtf_content, 2, span.start, span.end,
+                                             page_number=span.number - 1))
+    assert [layout.number for layout in layouts] == [2]
+    assert layouts[0].rows[0].cells == ["Table 14.1.2"]
+
+def test_parse_pages_gives_text_of_cells():
+    rtf_content = ("\\endnhere\\trowd{Line1\\par Line2\\tab X\\cell}"
+                   "{\\b Bold\\b0  text\\line end\\cell}{A\\~B \\emdash\\{C\\}\\cell}{\\row}")
+    assert cells(rtf_content) == [["Line1 Line2 X", "Bold text end", "A B —{C}"]]
+
+def test_parse_pages_gives_fields_and_skips_destinations():
+    rtf_content = ("\\endnhere{\\header\\trowd{Page {\\field{\\*\\fldinst { PAGE }}"
+                   "{\\fldrslt 9}} of {\\field{\\*\\fldinst { NUMPAGES }}}\\cell}{\\row}}"
+                   "\\trowd{A{\\*\\bkmkstart x}{\\footer B}{\\pict 0123}\\cell}{\\row}")
+    layout = page_layouts(rtf_content, 3)[0]
+    assert [row.cells for row in layout.header_rows] == [["Page 1 of 3"]]
+    assert [row.cells for row in layout.rows] == [["A"]]
+
+def test_index_pages_finds_span_of_each_page():
+    spans = rtf_tokenizer.index_pages("{\\rtf1 \\endnhere A\\endnhere B}")
+    assert spans == [rtf_tokenizer.PageSpan(1, 7, 18), rtf_tokenizer.PageSpan(2, 18, 30)]
+
+def test_decode_text_decodes_character_escapes():
+    assert rtf_tokenizer.decode_text("caf\\'e9 \\u8805?5 \\u-4064?") == "café ≥5 \uf020"
+    assert rtf_tokenizer.decode_text("\\uc2\\u8805\\'3f\\'3f5 \\uc0\\u8805 5") == "≥5 ≥5"
+    assert rtf_tokenizer.decode_text("\\u55357?\\u56832?") == "\U0001f600"
+    assert rtf_tokenizer.decode_text("\\u8805 65", fallback=0) == "≥65"
+
+def test_unicode_fallback_of_document_header():
+    assert rtf_tokenizer.unicode_fallback("{\\rtf1\\ansi\\uc0{\\fonttbl{\\uc3 A;}}") == 0
+    assert rtf_tokenizer.unicode_fallback("{\\rtf1\\ansi{\\fonttbl}") == 1
+
+def test_parse_pages_keeps_fallback_of_each_group():
+    rtf_content = ("\\endnhere\\trowd{\\u8805 65\\cell}"
+                   "{A{\\uc2\\u8805 ab65}\\u8805 x65\\cell}{\\row}"
+                   "\\uc2\\trowd{\\u8805\\'3f\\'3f65\\cell}{\\b\\u8805 ab65\\cell}{\\row}")
+    layout = list(rtf_tokenizer.parse_pages(rtf_content, 1, fallback=0))[0]
+    assert [row.cells for row in layout.rows] == [["≥65", "A≥65≥x65"], ["≥65", "≥65"]]
+
+def test_group_index_matches_braces():
+    rtf_content = "{a{b\\{c}\\\\}{d}{"
+    assert rtf_tokenizer.group_index(rtf_content) == {0: 10, 2: 7, 11: 13}
+    assert rtf_tokenizer.group_index(rtf_content, 1, 8) == {2: 7}
+
+def test_parse_pages_jumps_over_skipped_groups():
+    rtf_content = ("\\endnhere{\\*\\generator {\\trowd{X\\cell}{\\row}}}"
+                   "{\\info{\\title T}}\\trowd{A\\cell}{\\row}")
+    layout = list(rtf_tokenizer.parse_pages(rtf_content, 1))[0]
+    assert [row.cells for row in layout.rows] == [["A"]]
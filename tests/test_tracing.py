@@ -0,0 +1,57 @@
+'''
+Tests of the tracing and profiling of the conversion stages
+'''
+import json
+import pstats
+
+import pytest
+
+from BatchProcessing import batch_processing, manifest
+
+def convert(rtf_file, output_folder, **options):
+    '''
+    Function to convert the RTF file of the fixture and give its result
+    '''
+    return list(batch_processing.convert_files([rtf_file.name], str(rtf_file.parent),
+                                               str(output_folder), 1, **options))[0]
+
+def test_json_trace_has_totals_of_each_stage(rtf_file, tmp_path):
+    result = convert(rtf_file, tmp_path / "Output", trace="json")
+    assert result.status == "Successful"
+    with open(tmp_path / "Output" / "t_14_1.trace.json", 'r', encoding="utf-8") as trace_file:
+        trace = json.load(trace_file)
+    assert trace["file"] == rtf_file.name
+    assert trace["stages"]["parse_page"]["calls"] == 2
+    assert trace["stages"]["parse_page"]["bytes"] > 0
+    assert trace["stages"]["write_output"]["calls"] == 1
+    assert [page["page"] for page in trace["pages"]] == [1, 2]
+    assert "extract_table_data" in trace["pages"][0]["stages"]
+
+def test_chrome_trace_has_complete_events(rtf_file, tmp_path):
+    convert(rtf_file, tmp_path / "Output", trace="chrome")
+    path = tmp_path / "Output" / "t_14_1.chrome-trace.json"
+    with open(path, 'r', encoding="utf-8") as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    assert {event["ph"] for event in events} == {"X"}
+    assert {event["args"]["page"] for event in events if "page" in event["args"]} == {1, 2}
+
+def test_cprofile_writes_statistics(rtf_file, tmp_path):
+    result = convert(rtf_file, tmp_path / "Output", profile="cprofile")
+    assert result.status == "Successful"
+    statistics = pstats.Stats(str(tmp_path / "Output" / "t_14_1.prof"))
+    assert any(function[2] == "process_file" for function in statistics.stats)
+
+def test_tracemalloc_writes_report(rtf_file, tmp_path):
+    convert(rtf_file, tmp_path / "Output", profile="tracemalloc")
+    with open(tmp_path / "Output" / "t_14_1.tracemalloc.txt", 'r', encoding="utf-8") as report:
+        assert report.readline().startswith("Current memory: ")
+
+@pytest.mark.parametrize("options", [{"trace": "json"}, {"profile": "cprofile"}])
+def test_trace_and_profile_imply_force(rtf_file, tmp_path, options):
+    output_folder = tmp_path / "Output"
+    assert convert(rtf_file, output_folder, incremental=True).remarks != \
+        manifest.SKIPPED_REMARKS
+    assert convert(rtf_file, output_folder, incremental=True).remarks == \
+        manifest.SKIPPED_REMARKS
+    assert convert(rtf_file, output_folder, incremental=True, **options).remarks != \
+        manifest.SKIPPED_REMARKS